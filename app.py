@@ -1,11 +1,21 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from routes.auth import auth_bp
 from routes.rooms import rooms_bp
 from routes.schedules import schedules_bp
 from routes.schedules_feedback import schedules_feedback_bp
+from routes.users import users_bp
+from routes.schedule_places import schedule_places_bp
+from routes.schedule_revisions import schedule_revisions_bp
+from routes.admin import admin_bp
+from routes.places import places_bp
+from db import ensure_indexes
+from util.reclaimer import start_reclaimer
+from util.password_hasher import HashPoolBusy
+from util.session_tokens import InvalidSessionToken, SessionMismatch
 from dotenv import load_dotenv
 
+import multiprocessing
 import os
 
 load_dotenv()
@@ -25,6 +35,37 @@ app.register_blueprint(auth_bp, url_prefix="/api/auth")
 app.register_blueprint(rooms_bp, url_prefix="/api")
 app.register_blueprint(schedules_bp, url_prefix="/api")
 app.register_blueprint(schedules_feedback_bp, url_prefix="/api")
+app.register_blueprint(users_bp, url_prefix="/api")
+app.register_blueprint(schedule_places_bp, url_prefix="/api")
+app.register_blueprint(schedule_revisions_bp, url_prefix="/api")
+app.register_blueprint(admin_bp, url_prefix="/api")
+app.register_blueprint(places_bp, url_prefix="/api")
+
+
+@app.errorhandler(InvalidSessionToken)
+def handle_invalid_session(e):
+    return jsonify({"error": "Invalid or expired session token"}), 401
+
+
+@app.errorhandler(SessionMismatch)
+def handle_session_mismatch(e):
+    return jsonify({"error": "userId does not match session"}), 403
+
+
+@app.errorhandler(HashPoolBusy)
+def handle_hash_pool_busy(e):
+    return jsonify({"error": "Too many login requests, retry shortly"}), 503, {"Retry-After": "1"}
+
+
+# 비밀번호 해시 프로세스 풀(spawn)의 자식 프로세스가 이 모듈을 다시 불러올 때는 실행하지 않음
+if multiprocessing.parent_process() is None:
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"Error creating indexes: {e}")
+
+    # 삭제된 방 / 탈퇴한 사용자 데이터 정리 워커 (RECLAIMER_INTERVAL=0 이면 비활성)
+    start_reclaimer()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
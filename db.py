@@ -1,7 +1,8 @@
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
 import gridfs
-import os
+import os, traceback
 
 load_dotenv()
 MONGO_PW = os.getenv("MONGO_PW")
@@ -17,3 +18,111 @@ fs = gridfs.GridFS(db)
 users = db["users"]
 rooms = db["rooms"]
 schedules = db["schedules"]
+schedule_items = db["schedule_items"]
+schedule_places = db["schedule_places"]
+schedule_revisions = db["schedule_revisions"]
+cleanup_jobs = db["cleanup_jobs"]
+
+
+def _duplicate_groups(collection, keys):
+    """keys 값이 같은 문서가 둘 이상인 그룹의 _id 목록"""
+    group_id = {field.replace(".", "_"): f"${field}" for field, _ in keys}
+    return [g["ids"] for g in collection.aggregate([
+        {"$group": {"_id": group_id, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)]
+
+
+def ensure_unique_index(collection, keys, merge=None):
+    """
+    고유 인덱스 생성. 같은 키의 일반 인덱스가 이미 있으면 중복 문서를 먼저 정리(merge)한 뒤 교체함.
+    중복을 정리할 수 없으면 기존 일반 인덱스를 그대로 두고, 교체에 실패하면 일반 인덱스를 다시 만듦
+    """
+    keys = list(keys)
+    try:
+        collection.create_index(keys, unique=True)
+        return
+    except OperationFailure:
+        pass
+
+    duplicates = _duplicate_groups(collection, keys)
+    if duplicates:
+        if merge is None:
+            print(f"Keeping non-unique index on {collection.name} {keys}: {len(duplicates)} duplicate groups")
+            return
+        for ids in duplicates:
+            merge(ids)
+
+    for name, info in collection.index_information().items():
+        if info["key"] == keys and not info.get("unique"):
+            collection.drop_index(name)
+    try:
+        collection.create_index(keys, unique=True)
+    except OperationFailure:
+        traceback.print_exc()
+        collection.create_index(keys)
+
+
+def _merge_schedules(ids):
+    """
+    한 방의 schedules 문서가 여럿이면 하나만 남김
+    (split 문서 > 리비전이 가장 많이 진행된 문서 > 가장 최근 문서 순으로 선택)
+    """
+    docs = list(schedules.find({"_id": {"$in": ids}}, {"storage": 1, "revision": 1}))
+    keep = max(docs, key=lambda d: (d.get("storage") == "split", d.get("revision") or 0, d["_id"]))
+    dropped = [d["_id"] for d in docs if d["_id"] != keep["_id"]]
+    print(f"Merging duplicate schedules: keeping {keep['_id']}, removing {dropped}")
+    schedules.delete_many({"_id": {"$in": dropped}})
+
+
+def _safe(create, *args, **kwargs):
+    """인덱스 하나를 만들다 실패해도 나머지 인덱스는 계속 만들도록 함"""
+    try:
+        create(*args, **kwargs)
+    except Exception:
+        traceback.print_exc()
+
+
+def ensure_indexes():
+    """서버 시작 시 필요한 인덱스 생성 (이미 있으면 무시됨)"""
+    # 사용자 검색: 정규화 필드에 대한 접두사(^prefix) 검색용
+    # (기존 사용자 채우기는 python -m util.search_keys 로 한 번 실행)
+    _safe(users.create_index, "id")
+    _safe(users.create_index, "idLower")
+    _safe(users.create_index, "nicknameLower")
+    _safe(users.create_index, "searchKeyVersion")
+
+    # split 방식 일정 (일정 하나당 문서 하나), position은 방 / 날짜 안에서 겹치지 않음
+    _safe(ensure_unique_index, schedule_items, [("room_id", 1), ("day", 1), ("position", 1)])
+    _safe(schedule_items.create_index, [("room_id", 1), ("day", 1), ("start", 1)])
+
+    # 일정 장소 좌표 (GeoJSON Point): 방 단위 근접 / 영역 검색용
+    _safe(ensure_unique_index, schedule_places, [("room_id", 1), ("day", 1), ("index", 1)])
+    _safe(schedule_places.create_index, [("location", "2dsphere"), ("room_id", 1)])
+
+    # 일정 리비전 (JSON Patch + 주기적 스냅샷)
+    _safe(schedule_revisions.create_index, [("room_id", 1), ("rev", -1)], unique=True)
+
+    # 방 / 일정 조회 및 고아 데이터 정리(reclaimer) 배치 스캔용
+    # 방당 schedules 문서는 하나 (embedded 쓰기의 upsert가 split 문서와 중복 생성되지 않도록)
+    _safe(ensure_unique_index, schedules, [("room_id", 1)], merge=_merge_schedules)
+    _safe(rooms.create_index, "members")
+    _safe(rooms.create_index, "pendingInvites")
+    _safe(rooms.create_index, "ownerId")
+    _safe(rooms.create_index, "imageId", sparse=True)
+    _safe(db.fs.files.create_index, "uploadDate")
+    # GridFS 기본 청크 인덱스 (고아 청크 범위 스캔에도 사용)
+    _safe(db.fs.chunks.create_index, [("files_id", 1), ("n", 1)], unique=True)
+    _safe(cleanup_jobs.create_index, [("status", 1), ("notBefore", 1), ("createdAt", 1)])
+    # 완료된 정리 작업은 7일 후 자동 삭제
+    _safe(cleanup_jobs.create_index, "finishedAt", expireAfterSeconds=7 * 24 * 3600)
+
+    # 외부 API 호출 한도 카운터 (충전 주기가 지나면 자동 삭제) / 방별 사용량
+    _safe(db.rate_limits.create_index, "expireAt", expireAfterSeconds=0)
+    _safe(db.api_usage.create_index, [("room_id", 1), ("date", -1)], unique=True)
+
+    # 장소 자동완성 / 상세 정보 공유 캐시 (expireAt 이후 자동 삭제)
+    _safe(db.place_autocomplete_cache.create_index, "expireAt", expireAfterSeconds=0)
+    _safe(db.place_details_cache.create_index, "expireAt", expireAfterSeconds=0)
+    # Google에 보낸 자동완성 세션 토큰 (상세 정보가 캐시에 있을 때 닫을 세션만 구분)
+    _safe(db.place_sessions.create_index, "expireAt", expireAfterSeconds=0)
@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify
+from bson import ObjectId
+from datetime import datetime, timezone
+from db import db
+from util.reclaimer import reclaim_orphans
+import hmac, os, threading, traceback
+
+admin_bp = Blueprint("admin", __name__)
+
+
+def is_admin():
+    """X-Admin-Token 헤더가 ADMIN_TOKEN 환경변수와 일치하는지 확인 (미설정 시 항상 거부)"""
+    token = os.getenv("ADMIN_TOKEN")
+    given = request.headers.get("X-Admin-Token", "")
+    return bool(token) and hmac.compare_digest(token, given)
+
+
+def run_reclaim(run_id, dry_run, max_per_sec):
+    """백그라운드에서 고아 데이터 정리 후 결과를 reclaim_runs에 기록"""
+    try:
+        report = reclaim_orphans(dry_run=dry_run, max_per_sec=max_per_sec)
+        db.reclaim_runs.update_one(
+            {"_id": run_id},
+            {"$set": {"status": "done", "report": report, "finishedAt": datetime.now(timezone.utc)}}
+        )
+    except Exception as e:
+        traceback.print_exc()
+        db.reclaim_runs.update_one({"_id": run_id}, {"$set": {"status": "failed", "error": str(e)}})
+
+
+# 고아 데이터 정리 시작
+@admin_bp.route("/admin/reclaim", methods=["POST"])
+def start_reclaim():
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        dry_run = request.args.get("dryRun", "false").lower() in ("1", "true", "yes")
+        try:
+            max_per_sec = float(request.args.get("rate", 50))
+        except ValueError:
+            return jsonify({"error": "Invalid rate"}), 400
+
+        run_id = db.reclaim_runs.insert_one({
+            "status": "running",
+            "dryRun": dry_run,
+            "rate": max_per_sec,
+            "startedAt": datetime.now(timezone.utc)
+        }).inserted_id
+        threading.Thread(target=run_reclaim, args=(run_id, dry_run, max_per_sec), daemon=True).start()
+        return jsonify({"message": "Reclaim started", "runId": str(run_id)}), 202
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# 정리 결과 조회
+@admin_bp.route("/admin/reclaim/<run_id>", methods=["GET"])
+def get_reclaim_run(run_id):
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        run = db.reclaim_runs.find_one({"_id": ObjectId(run_id)})
+    except:
+        return jsonify({"error": "Invalid runId"}), 400
+    if not run:
+        return jsonify({"error": "Run not found"}), 404
+    run["_id"] = str(run["_id"])
+    return jsonify(run), 200
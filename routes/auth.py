@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify, make_response
-from werkzeug.security import generate_password_hash, check_password_hash
 from bson import ObjectId
 from db import users
+from routes.users import search_cache
+from util.search_keys import search_fields, search_key
+from util.reclaimer import enqueue_cleanup
+from util.password_hasher import hash_password, verify_password, needs_rehash
+from util.session_tokens import issue_token, current_session
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -26,13 +30,17 @@ def signup():
     if users.find_one({"id": id}):
         return jsonify({"error": "id exists"}), 409
 
-    hashed_pw = generate_password_hash(password)
+    hashed_pw = hash_password(password)
     user = {
         "id": id,
         "password": hashed_pw,
         "nickname": nickname,
+        # 사용자 검색(접두사 검색)용 정규화 필드
+        **search_fields(id, nickname),
     }
     result = users.insert_one(user)
+    search_cache.invalidate_prefixes_of(search_key(id))
+    search_cache.invalidate_prefixes_of(search_key(nickname))
 
     return jsonify({
         "status": "ok",
@@ -50,15 +58,35 @@ def login():
     password = data.get("password", "").strip()
 
     user = users.find_one({"id": id})
-    if not user or not check_password_hash(user["password"], password):
+    if not user or not verify_password(user["password"], password):
         return jsonify({"error": "Invalid credentials"}), 401
 
+    # 해시 방식 / 비용 파라미터가 바뀌었으면 로그인 시 새 설정으로 다시 해시
+    if needs_rehash(user["password"]):
+        users.update_one({"_id": user["_id"]}, {"$set": {"password": hash_password(password)}})
+
+    token, expires_at = issue_token(user["_id"], user["id"])
 
     return jsonify({
         "status": "ok",
         "userId": str(user["_id"]),  
         "id": user["id"],
-        "nickname": user["nickname"]
+        "nickname": user["nickname"],
+        "token": token,
+        "expiresAt": expires_at
+    }), 200
+
+
+# 세션 토큰 확인 (DB 조회 없이 서명만 검증)
+@auth_bp.route("/session", methods=["GET"])
+def get_session():
+    session = current_session()
+    if not session:
+        return jsonify({"error": "Missing session token"}), 401
+    return jsonify({
+        "userId": session["sub"],
+        "id": session["id"],
+        "expiresAt": session["exp"]
     }), 200
 
 
@@ -70,8 +98,12 @@ def delete_account():
     password = data.get("password")
 
     user = users.find_one({"id": id})
-    if not user or not check_password_hash(user["password"], password):
+    if not user or not verify_password(user["password"], password):
         return jsonify({"error": "Invalid credentials"}), 401
 
     users.delete_one({"id": id})
+    # 방 멤버십 / 초대 / 소유한 방은 백그라운드 정리 작업으로 처리
+    enqueue_cleanup("user", user["_id"])
+    search_cache.invalidate_prefixes_of(search_key(user["id"]))
+    search_cache.invalidate_prefixes_of(search_key(user.get("nickname", "")))
     return jsonify({"status": "deleted"}), 200
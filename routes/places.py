@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify
+from bson import ObjectId
+from db import db
+from util.place_search import autocomplete
+from util.rate_limit import RateLimitExceeded, too_many_requests
+from util.session_tokens import optional_session_user_id
+import traceback, uuid
+
+places_bp = Blueprint("places", __name__)
+
+
+# 장소 자동완성 (방의 국가 기준으로 검색)
+@places_bp.route("/rooms/<room_id>/places/autocomplete", methods=["GET"])
+def autocomplete_place(room_id):
+    try:
+        text = request.args.get("input", "").strip()
+        if not text:
+            return jsonify({"error": "input is required"}), 400
+
+        try:
+            room_oid = ObjectId(room_id)
+        except:
+            return jsonify({"error": "Invalid roomId"}), 400
+        room = db.rooms.find_one({"_id": room_oid}, {"country": 1})
+        if not room:
+            return jsonify({"error": "Room not found"}), 404
+
+        # 세션 토큰이 없으면 새로 발급 → 클라이언트는 장소를 고를 때까지 같은 토큰을 사용하고,
+        # 일정 추가 시 선택한 placeId와 함께 보내면 하나의 세션으로 과금됨
+        session_token = request.args.get("sessionToken") or uuid.uuid4().hex
+
+        predictions = autocomplete(
+            text,
+            country=room.get("country"),
+            session_token=session_token,
+            room_id=room_id,
+            user_id=optional_session_user_id()
+        )
+        return jsonify({"sessionToken": session_token, "predictions": predictions}), 200
+
+    except RateLimitExceeded as e:
+        return too_many_requests(e)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify, make_response, send_file
 from bson import ObjectId
 from datetime import datetime, timezone
-from routes.schedules import delete_schedule
 from db import db, users, fs
 from gridfs.errors import NoFile
 from werkzeug.datastructures import FileStorage
+from util.reclaimer import enqueue_cleanup
+from util.session_tokens import session_user_id
 
 rooms_bp = Blueprint("rooms", __name__)
 
@@ -16,8 +17,9 @@ def create_room():
     if not all(k in data and data[k] for k in required):
         return jsonify({"error": "Missing fields"}), 400
 
+    creator_id = session_user_id(data["creatorId"])
     try:
-        owner_oid = ObjectId(data["creatorId"])
+        owner_oid = ObjectId(creator_id)
     except:
         return jsonify({"error": "Invalid creatorId"}), 400
 
@@ -67,10 +69,11 @@ def get_image(image_id):
 # 방 삭제
 @rooms_bp.route("/rooms/<room_id>", methods=["DELETE"])
 def delete_room(room_id):
-    result = db.rooms.delete_one({"_id": ObjectId(room_id)})
-    delete_schedule(room_id)  # 방 삭제 시 일정도 함께 삭제
-    if result.deleted_count == 0:
+    room = db.rooms.find_one_and_delete({"_id": ObjectId(room_id)}, {"imageId": 1})
+    if not room:
         return jsonify({"error": "Room not found"}), 404
+    # 일정 / 커버 이미지 등은 백그라운드 정리 작업으로 삭제
+    enqueue_cleanup("room", room["_id"], imageId=room.get("imageId"))
     return jsonify({"status": "deleted"}), 200
 
 # 방 정보 업데이트
@@ -83,6 +86,7 @@ def update_room(room_id):
         data = request.form
 
     update_data = {}
+    old_image_id = None
 
     for field in ["title", "country", "startDate", "endDate"]:
         if field in data and data[field]:
@@ -92,13 +96,10 @@ def update_room(room_id):
     if 'image' in request.files:
         image_file: FileStorage = request.files['image']
         
-        # 기존 이미지 삭제 (선택적)
-        room_to_update = db.rooms.find_one({"_id": ObjectId(room_id)})
+        # 기존 이미지는 업데이트 후 백그라운드 정리 작업으로 삭제
+        room_to_update = db.rooms.find_one({"_id": ObjectId(room_id)}, {"imageId": 1})
         if room_to_update and room_to_update.get("imageId"):
-            try:
-                fs.delete(room_to_update["imageId"])
-            except Exception as e:
-                print(f"Error deleting old image: {e}")
+            old_image_id = room_to_update["imageId"]
 
         # 새 이미지 저장
         image_id = fs.put(image_file, filename=image_file.filename, content_type=image_file.content_type)
@@ -110,12 +111,15 @@ def update_room(room_id):
     result = db.rooms.update_one({"_id": ObjectId(room_id)}, {"$set": update_data})
     if result.matched_count == 0:
         return jsonify({"error": "Room not found"}), 404
+    if old_image_id:
+        enqueue_cleanup("image", old_image_id)
     
     return get_room_detail(room_id) # 업데이트된 방 정보를 반환
 
 # 내가 속한 방 보기
 @rooms_bp.route("/rooms/user/<user_id>", methods=["GET"])
 def get_user_rooms(user_id):
+    user_id = session_user_id(user_id)
     try:
         user_oid = ObjectId(user_id)
     except:
@@ -134,6 +138,7 @@ def get_user_rooms(user_id):
 # 초대된 방 보기
 @rooms_bp.route("/rooms/invited/<user_id>", methods=["GET"])
 def get_invited_rooms(user_id):
+    user_id = session_user_id(user_id)
     try:
         user_oid = ObjectId(user_id)
     except:
@@ -215,7 +220,7 @@ def get_room_detail(room_id):
 @rooms_bp.route("/rooms/<room_id>/accept", methods=["POST"])
 def accept_invite(room_id):
     data = request.get_json()
-    user_id = data.get("userId")
+    user_id = session_user_id(data.get("userId"))
 
     try:
         user_oid = ObjectId(user_id)
@@ -239,7 +244,7 @@ def accept_invite(room_id):
 @rooms_bp.route("/rooms/<room_id>/decline", methods=["POST"])
 def decline_invite(room_id):
     data = request.get_json()
-    user_id = data.get("userId")
+    user_id = session_user_id(data.get("userId"))
     
     try:
         user_oid = ObjectId(user_id)
@@ -319,4 +324,20 @@ def get_room_members(room_id):
                 "nickname": user.get("nickname", "")
             })
 
-    return jsonify(members_info), 200
\ No newline at end of file
+    return jsonify(members_info), 200
+
+# 방별 외부 API(Gemini / Google Maps) 사용량 조회
+@rooms_bp.route("/rooms/<room_id>/usage", methods=["GET"])
+def get_room_usage(room_id):
+    try:
+        room_oid = ObjectId(room_id)
+    except:
+        return jsonify({"error": "Invalid roomId"}), 400
+
+    daily = list(db.api_usage.find({"room_id": room_oid}, {"_id": 0, "room_id": 0}).sort("date", -1).limit(90))
+    total = {"gemini": 0, "maps": 0}
+    for d in daily:
+        for api in total:
+            total[api] += d.get(api, 0)
+
+    return jsonify({"total": total, "daily": daily}), 200
@@ -0,0 +1,160 @@
+from flask import Blueprint, request, jsonify
+from bson import ObjectId
+from db import db
+from util.geo_utils import bounding_box, cluster_points
+from util.schedule_places import sync_room_places
+import traceback
+
+schedule_places_bp = Blueprint("schedule_places", __name__)
+
+MAX_RESULTS = 200
+PLACE_PROJECTION = {
+    "_id": 0, "day": 1, "index": 1, "title": 1, "place": 1, "placeId": 1,
+    "startHour": 1, "startMinute": 1, "location": 1
+}
+
+
+def ensure_room_places(room_oid):
+    """
+    좌표 컬렉션 도입 이전에 만들어진 일정은 최초 조회 시 한 번 채워 넣고,
+    일정 변경 후 좌표 반영에 실패한 방(placesStale)은 다시 채움
+    """
+    # 표시를 먼저 지우고 채움 (채우다 실패하면 sync_room_places가 다시 표시함)
+    if db.schedules.find_one_and_update(
+        {"room_id": room_oid, "placesStale": True},
+        {"$unset": {"placesStale": ""}},
+        projection={"_id": 1}
+    ):
+        sync_room_places(str(room_oid))
+        return
+    if db.schedule_places.find_one({"room_id": room_oid}, {"_id": 1}):
+        return
+    if db.schedules.find_one({"room_id": room_oid}, {"_id": 1}):
+        sync_room_places(str(room_oid))
+
+
+def to_response(doc):
+    lng, lat = doc.pop("location")["coordinates"]
+    doc["lat"] = lat
+    doc["lng"] = lng
+    if "distance" in doc:
+        doc["distance"] = round(doc["distance"], 1)
+    return doc
+
+
+def parse_limit(default=50):
+    return max(1, min(int(request.args.get("limit", default)), MAX_RESULTS))
+
+
+# -----------------------
+# 특정 좌표 근처의 일정 장소 (GET)
+# -----------------------
+@schedule_places_bp.route("/rooms/<room_id>/schedule/places/near", methods=["GET"])
+def get_places_near(room_id):
+    try:
+        try:
+            room_oid = ObjectId(room_id)
+            lat = float(request.args["lat"])
+            lng = float(request.args["lng"])
+            radius = float(request.args.get("radius", 1000))  # 미터
+            limit = parse_limit(20)
+        except (KeyError, ValueError, TypeError):
+            return jsonify({"error": "lat, lng are required (radius, limit optional)"}), 400
+
+        ensure_room_places(room_oid)
+
+        query = {"room_id": room_oid}
+        if request.args.get("day"):
+            query["day"] = request.args["day"]
+
+        pipeline = [
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [lng, lat]},
+                "distanceField": "distance",
+                "maxDistance": radius,
+                "query": query,
+                "spherical": True
+            }},
+            {"$limit": limit},
+            {"$project": {**PLACE_PROJECTION, "distance": 1}}
+        ]
+        places = [to_response(p) for p in db.schedule_places.aggregate(pipeline)]
+        return jsonify(places), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------
+# 지도 화면 영역 안의 일정 장소 (GET)
+# -----------------------
+@schedule_places_bp.route("/rooms/<room_id>/schedule/places/within", methods=["GET"])
+def get_places_within(room_id):
+    try:
+        try:
+            room_oid = ObjectId(room_id)
+            sw_lat = float(request.args["swLat"])
+            sw_lng = float(request.args["swLng"])
+            ne_lat = float(request.args["neLat"])
+            ne_lng = float(request.args["neLng"])
+            limit = parse_limit()
+        except (KeyError, ValueError, TypeError):
+            return jsonify({"error": "swLat, swLng, neLat, neLng are required"}), 400
+
+        ensure_room_places(room_oid)
+
+        box = {"type": "Polygon", "coordinates": [[
+            [sw_lng, sw_lat], [ne_lng, sw_lat], [ne_lng, ne_lat], [sw_lng, ne_lat], [sw_lng, sw_lat]
+        ]]}
+        query = {"room_id": room_oid, "location": {"$geoWithin": {"$geometry": box}}}
+        if request.args.get("day"):
+            query["day"] = request.args["day"]
+
+        cursor = db.schedule_places.find(query, PLACE_PROJECTION).limit(limit)
+        return jsonify([to_response(p) for p in cursor]), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------
+# 특정 날짜 장소 클러스터 + 경계 상자 (GET)
+# -----------------------
+@schedule_places_bp.route("/rooms/<room_id>/schedule/day/<day>/clusters", methods=["GET"])
+def get_day_clusters(room_id, day):
+    try:
+        try:
+            room_oid = ObjectId(room_id)
+            radius = float(request.args.get("radius", 500))  # 미터
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid roomId or radius"}), 400
+
+        ensure_room_places(room_oid)
+
+        cursor = db.schedule_places.find({"room_id": room_oid, "day": day}, PLACE_PROJECTION).sort("index", 1)
+        points = []
+        for doc in cursor:
+            doc["coordinates"] = doc["location"]["coordinates"]
+            points.append(doc)
+
+        clusters = []
+        for c in cluster_points(points, radius):
+            coords = [m["coordinates"] for m in c["members"]]
+            clusters.append({
+                "center": {"lat": c["center"][1], "lng": c["center"][0]},
+                "bbox": bounding_box(coords),
+                "places": [to_response({k: v for k, v in m.items() if k != "coordinates"})
+                           for m in c["members"]]
+            })
+
+        return jsonify({
+            "day": day,
+            "bbox": bounding_box([p["coordinates"] for p in points]),
+            "clusters": clusters
+        }), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,122 @@
+from flask import Blueprint, request, jsonify
+from bson import ObjectId
+from db import db
+from util.schedule_repository import get_schedule_repository, ScheduleConflict
+from util.json_patch import make_patch
+from util.schedule_places import sync_room_places
+from util.schedule_revisions import record_revision, load_revision, ensure_revision_baseline
+import traceback
+
+schedule_revisions_bp = Blueprint("schedule_revisions", __name__)
+
+
+# -----------------------
+# 일정 리비전 목록 (GET)
+# -----------------------
+@schedule_revisions_bp.route("/rooms/<room_id>/schedule/revisions", methods=["GET"])
+def list_revisions(room_id):
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+        query = {"room_id": ObjectId(room_id)}
+        if request.args.get("before"):
+            query["rev"] = {"$lt": int(request.args["before"])}
+
+        # 패치 본문은 크기만 계산하고 응답에는 포함하지 않음
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"rev": -1}},
+            {"$limit": limit},
+            {"$project": {
+                "_id": 0,
+                "rev": 1,
+                "source": 1,
+                "createdAt": 1,
+                "opCount": {"$size": "$patch"},
+                "snapshot": {"$gt": ["$snapshot", None]}
+            }}
+        ]
+        return jsonify(list(db.schedule_revisions.aggregate(pipeline))), 200
+
+    except ValueError:
+        return jsonify({"error": "Invalid limit or before"}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------
+# 두 리비전 비교 (GET)
+# -----------------------
+@schedule_revisions_bp.route("/rooms/<room_id>/schedule/revisions/diff", methods=["GET"])
+def diff_revisions(room_id):
+    try:
+        try:
+            from_rev = int(request.args["from"])
+            to_rev = int(request.args["to"])
+        except (KeyError, ValueError):
+            return jsonify({"error": "from, to are required"}), 400
+
+        src = load_revision(room_id, from_rev)
+        dst = load_revision(room_id, to_rev)
+        if src is None or dst is None:
+            return jsonify({"error": "Revision not found"}), 404
+
+        return jsonify({
+            "from": from_rev,
+            "to": to_rev,
+            "patch": make_patch(src, dst)
+        }), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------
+# 특정 리비전 일정 조회 (GET)
+# -----------------------
+@schedule_revisions_bp.route("/rooms/<room_id>/schedule/revisions/<int:rev>", methods=["GET"])
+def get_revision(room_id, rev):
+    try:
+        schedule = load_revision(room_id, rev)
+        if schedule is None:
+            return jsonify({"error": "Revision not found"}), 404
+        return jsonify({"rev": rev, "schedule": schedule}), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------
+# 특정 리비전으로 되돌리기 (POST)
+# -----------------------
+@schedule_revisions_bp.route("/rooms/<room_id>/schedule/revisions/<int:rev>/rollback", methods=["POST"])
+def rollback_revision(room_id, rev):
+    try:
+        target = load_revision(room_id, rev)
+        if target is None:
+            return jsonify({"error": "Revision not found"}), 404
+
+        ensure_revision_baseline(room_id)
+        repository = get_schedule_repository(room_id)
+        current, revision = repository.read_schedule()
+        if current is None:
+            return jsonify({"error": "Schedule not found"}), 404
+
+        new_rev = repository.replace_schedule(target, revision=revision)
+        # 되돌리기도 하나의 리비전으로 기록되므로 다시 되돌릴 수 있음
+        record_revision(room_id, current, target, f"rollback:{rev}", new_rev)
+        sync_room_places(room_id)
+
+        return jsonify({
+            "message": f"Schedule rolled back to revision {rev}",
+            "rev": new_rev,
+            "schedule": target
+        }), 200
+
+    except ScheduleConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify, make_response
-from bson import ObjectId
 from util.google_utils import get_place_info
-from db import db  # MongoDB 연 결
+from util.place_search import place_details
+from util.geo_utils import to_geojson_point
+from util.schedule_places import sync_day_places, delete_room_places
+from util.schedule_revisions import record_revision, delete_revisions, ensure_revision_baseline
+from util.rate_limit import acquire, record_usage, RateLimitExceeded, too_many_requests
+from util.session_tokens import optional_session_user_id
+from util.schedule_repository import get_schedule_repository, ScheduleConflict
 import traceback
 
 schedules_bp = Blueprint("schedules", __name__)
@@ -19,7 +24,7 @@ def json_utf8(data, status=200):
 @schedules_bp.route("/rooms/<room_id>/schedule", methods=["GET"])
 def get_schedule(room_id):
     try:
-        schedule = db.schedules.find_one({"room_id": ObjectId(room_id)})
+        schedule = get_schedule_repository(room_id).get_document()
         if not schedule:
             return jsonify({"error": "No schedule found for this room"}), 404
 
@@ -52,6 +57,31 @@ def validate_schedule_item(item):
 
     return None
 
+
+def validate_place_ref(place_id, session_token):
+    """자동완성에서 넘어온 placeId / sessionToken 검증 (문자열만 허용)"""
+    if place_id is not None and (not isinstance(place_id, str) or not place_id.strip()):
+        return "placeId must be a non-empty string"
+    if session_token is not None and (not isinstance(session_token, str) or not session_token.strip()):
+        return "sessionToken must be a non-empty string"
+    return None
+
+# -----------------------
+# 장소 검색 (호출 한도 적용)
+# -----------------------
+# 한도 초과 시 최대 MAPS_QUEUE_WAIT초까지 기다렸다가 재시도
+MAPS_QUEUE_WAIT = 2
+# 일정 추가 중 다른 요청과 겹쳤을 때 다시 읽고 추가하는 횟수
+ADD_RETRIES = 3
+
+def lookup_place(room_id, place_name, place_id=None, session_token=None):
+    # 자동완성에서 고른 placeId가 있으면 텍스트 검색 없이 (캐시된) 상세 정보 사용
+    if place_id:
+        return place_details(place_id, session_token, room_id=room_id, user_id=optional_session_user_id())
+    acquire("maps", room_id=room_id, user_id=optional_session_user_id(), max_wait=MAPS_QUEUE_WAIT)
+    record_usage("maps", room_id)
+    return get_place_info(place_name)
+
 # -----------------------
 # 특정 날짜 일정 추가 (POST)
 # -----------------------
@@ -72,7 +102,12 @@ def add_schedule_item(room_id, day):
 
         # Google Maps에서 장소 정보 가져오기
         place_name = item.get("place")
-        place_info = get_place_info(place_name)
+        place_id = item.pop("placeId", None)
+        session_token = item.pop("sessionToken", None)
+        error = validate_place_ref(place_id, session_token)
+        if error:
+            return jsonify({"error": error}), 400
+        place_info = lookup_place(room_id, place_name, place_id, session_token)
         if not place_info:
             return jsonify({"error": f"'{place_name}' 장소를 찾을 수 없습니다."}), 404
 
@@ -83,13 +118,26 @@ def add_schedule_item(room_id, day):
             if k != "name"
         }
         item["placeInfo"] = filtered_place_info
-
-        # DB에 저장
-        db.schedules.update_one(
-            {"room_id": ObjectId(room_id)},
-            {"$push": {f"schedule.{day}": item}},
-            upsert=True
-        )
+        # 공간 검색용 GeoJSON 좌표
+        item["location"] = to_geojson_point(filtered_place_info)
+
+        # DB에 저장 (읽은 뒤 다른 요청이 먼저 썼으면 다시 읽고 추가, 추가는 순서와 무관하므로 재시도해도 안전)
+        ensure_revision_baseline(room_id)
+        for attempt in range(ADD_RETRIES):
+            try:
+                repository = get_schedule_repository(room_id)
+                old_list, revision = repository.read_day(day)
+                rev = repository.add_item(day, item, revision)
+                break
+            except ScheduleConflict:
+                if attempt == ADD_RETRIES - 1:
+                    raise
+        old_list = old_list or []
+        day_list = old_list + [item]
+        # 해당 날짜가 새로 생긴 경우 이전 버전에는 날짜 키 자체가 없음
+        before = {day: old_list} if old_list else {}
+        record_revision(room_id, before, {day: day_list}, "add", rev)
+        sync_day_places(room_id, day)
 
         return jsonify({
             "message": f"'{item['place']}' 일정이 Day {day}에 추가되었습니다.",
@@ -97,6 +145,10 @@ def add_schedule_item(room_id, day):
             "placeInfo": filtered_place_info
         }), 200
 
+    except ScheduleConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except RateLimitExceeded as e:
+        return too_many_requests(e)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -109,22 +161,24 @@ def add_schedule_item(room_id, day):
 @schedules_bp.route("/rooms/<room_id>/schedule/day/<day>/<int:index>", methods=["DELETE"])
 def delete_schedule_item(room_id, day, index):
     try:
-        schedule = db.schedules.find_one({"room_id": ObjectId(room_id)})
-        if not schedule:
+        ensure_revision_baseline(room_id)
+        repository = get_schedule_repository(room_id)
+        old_list, revision = repository.read_day(day)
+        if old_list is None:
             return jsonify({"error": "Schedule not found"}), 404
 
-        day_list = schedule.get("schedule", {}).get(day, [])
-        if index < 0 or index >= len(day_list):
+        if index < 0 or index >= len(old_list):
             return jsonify({"error": "Invalid index"}), 400
 
-        # 해당 인덱스의 일정 제거
-        day_list.pop(index)
-        db.schedules.update_one(
-            {"room_id": ObjectId(room_id)},
-            {"$set": {f"schedule.{day}": day_list}}
-        )
+        # 해당 인덱스의 일정 제거 (읽은 뒤 다른 요청이 먼저 썼으면 409)
+        rev = repository.delete_item(day, index, revision)
+        day_list = old_list[:index] + old_list[index + 1:]
+        record_revision(room_id, {day: old_list}, {day: day_list}, "delete", rev)
+        sync_day_places(room_id, day)
         return jsonify({"message": f"Item {index} deleted from day {day}"}), 200
 
+    except ScheduleConflict as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -136,11 +190,15 @@ def delete_schedule_item(room_id, day, index):
 @schedules_bp.route("/rooms/<room_id>/schedule", methods=["DELETE"])
 def delete_schedule(room_id):
     try:
-        result = db.schedules.delete_one({"room_id": ObjectId(room_id)})
-        if result.deleted_count == 0:
+        deleted = get_schedule_repository(room_id).delete_all()
+        delete_room_places(room_id)
+        delete_revisions(room_id)
+        if not deleted:
             return jsonify({"error": "No schedule found to delete"}), 404
         return jsonify({"message": "Schedule deleted successfully"}), 200
 
+    except ScheduleConflict as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -162,44 +220,53 @@ def update_schedule_item(room_id, day, index):
         if error:
             return jsonify({"error": error}), 400
 
-        schedule = db.schedules.find_one({"room_id": ObjectId(room_id)})
-        if not schedule:
+        ensure_revision_baseline(room_id)
+        repository = get_schedule_repository(room_id)
+        old_list, revision = repository.read_day(day)
+        if old_list is None:
             return jsonify({"error": "Schedule not found"}), 404
 
-        schedule_data = schedule.get("schedule", {})
-        day_list = schedule_data.get(day, [])
-
-        if index < 0 or index >= len(day_list):
+        if index < 0 or index >= len(old_list):
             return jsonify({"error": "Invalid index"}), 400
 
-        old_item = day_list[index]
+        old_item = old_list[index]
         old_place = old_item.get("place")
         new_place = new_item.get("place")
+        old_place_id = (old_item.get("placeInfo") or old_item.get("place_info") or {}).get("place_id")
+        new_place_id = new_item.pop("placeId", None)
+        session_token = new_item.pop("sessionToken", None)
+        error = validate_place_ref(new_place_id, session_token)
+        if error:
+            return jsonify({"error": error}), 400
 
         # 장소가 바뀐 경우
-        if new_place and new_place != old_place:
-            from util.google_utils import get_place_info
-            place_info = get_place_info(new_place)
+        if (new_place_id and new_place_id != old_place_id) or (new_place and new_place != old_place):
+            place_info = lookup_place(room_id, new_place, new_place_id, session_token)
             if not place_info:
                 return jsonify({"error": f"'{new_place}' 장소를 찾을 수 없습니다."}), 404
 
             new_item["place_info"] = place_info
             new_item["place"] = place_info["name"]
+            new_item["location"] = to_geojson_point(place_info)
         else:
             new_item["place_info"] = old_item.get("place_info", {})
+            new_item["location"] = old_item.get("location")
 
-        # 수정 반영
-        day_list[index] = new_item
-        db.schedules.update_one(
-            {"room_id": ObjectId(room_id)},
-            {"$set": {f"schedule.{day}": day_list}}
-        )
+        # 수정 반영 (해당 항목만 변경, 읽은 뒤 다른 요청이 먼저 썼으면 409)
+        rev = repository.replace_item(day, index, new_item, revision)
+        day_list = old_list[:index] + [new_item] + old_list[index + 1:]
+        record_revision(room_id, {day: old_list}, {day: day_list}, "update", rev)
+        sync_day_places(room_id, day)
 
         return jsonify({
             "message": f"Item {index} on day {day} updated successfully",
             "place_info": new_item.get("place_info")
         }), 200
 
+    except ScheduleConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except RateLimitExceeded as e:
+        return too_many_requests(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
-from db import db
-from bson import ObjectId
+from util.schedule_repository import get_schedule_repository, ScheduleConflict
+from util.schedule_places import sync_room_places
+from util.schedule_revisions import record_revision, ensure_revision_baseline
+from util.rate_limit import acquire, record_usage, RateLimitExceeded, too_many_requests
+from util.session_tokens import optional_session_user_id
 import requests, os, threading, traceback, json, re
 
 schedules_feedback_bp = Blueprint("schedules_feedback", __name__)
@@ -11,13 +14,14 @@ def process_feedback(room_id: str):
     """백그라운드에서 AI 호출 및 DB 업데이트 처리"""
     try:
         api_key = os.getenv("GEMINI_API_KEY")
-        schedule_doc = db.schedules.find_one({"room_id": ObjectId(room_id)})
-        if not schedule_doc:
+        # AI 변경도 되돌릴 수 있도록 기록 이전 일정은 먼저 rev 0으로 저장
+        ensure_revision_baseline(room_id)
+        repository = get_schedule_repository(room_id)
+        original_schedule, revision = repository.read_schedule()
+        if original_schedule is None:
             print(f"No schedule found for room {room_id}")
             return
 
-        original_schedule = schedule_doc.get("schedule", {})
-
         # --- 프롬프트 최적화를 위한 데이터 가공 ---
         simplified_schedule_str = ""
         for day, items in sorted(original_schedule.items()):
@@ -64,6 +68,7 @@ I will also provide the full schedule in JSON format. You MUST use the full JSON
 
         gemini_api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={api_key}"
         response = requests.post(gemini_api_url, headers=headers, json=body, timeout=60)
+        record_usage("gemini", room_id)
         result = response.json()
 
         ai_text = (
@@ -88,15 +93,25 @@ I will also provide the full schedule in JSON format. You MUST use the full JSON
         mongo_schedule = {str(k): v for k, v in improved_schedule.items() if str(k).isdigit()}
 
         # DB 업데이트: schedule + feedback_applied + feedback_message + changes
-        db.schedules.update_one(
-            {"room_id": ObjectId(room_id)},
-            {"$set": {
-                "schedule": mongo_schedule,
-                "feedback_applied": True,
-                "feedback_message": feedback_data.get("feedback_message", "AI 피드백 완료"),
-                "changes": feedback_data.get("changes", [])
-            }}
-        )
+        # AI 호출 중 방이 split 방식으로 옮겨졌으면 저장소를 다시 골라 재시도
+        # (마이그레이션은 revision을 바꾸지 않음. 그 사이 사용자가 일정을 고쳤으면 덮어쓰지 않고 포기)
+        meta = {
+            "feedback_applied": True,
+            "feedback_message": feedback_data.get("feedback_message", "AI 피드백 완료"),
+            "changes": feedback_data.get("changes", [])
+        }
+        for attempt in range(3):
+            try:
+                new_rev = repository.replace_schedule(mongo_schedule, meta, revision)
+                break
+            except ScheduleConflict:
+                fresh = get_schedule_repository(room_id)
+                if attempt == 2 or fresh.storage == repository.storage:
+                    raise
+                repository = fresh
+
+        record_revision(room_id, original_schedule, mongo_schedule, "ai_feedback", new_rev)
+        sync_room_places(room_id)
 
         print(f"AI feedback applied for room {room_id}")
 
@@ -107,10 +122,14 @@ I will also provide the full schedule in JSON format. You MUST use the full JSON
 @schedules_feedback_bp.route("/rooms/<room_id>/schedule/feedback/auto", methods=["POST"])
 def auto_feedback(room_id):
     try:
+        # 방 / 사용자 / 전역 Gemini 호출 한도 확인 (초과 시 429 + Retry-After)
+        acquire("gemini", room_id=room_id, user_id=optional_session_user_id())
         threading.Thread(target=process_feedback, args=(room_id,)).start()
         return jsonify({
             "message": "AI feedback task started, processing in background"
         }), 202
+    except RateLimitExceeded as e:
+        return too_many_requests(e)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -119,7 +138,7 @@ def auto_feedback(room_id):
 @schedules_feedback_bp.route("/rooms/<room_id>/schedule/feedback/latest", methods=["GET"])
 def get_latest_feedback(room_id):
     try:
-        schedule_doc = db.schedules.find_one({"room_id": ObjectId(room_id)})
+        schedule_doc = get_schedule_repository(room_id).get_document()
         if not schedule_doc:
             return jsonify({"error": "No schedule found for this room"}), 404
 
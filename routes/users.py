@@ -0,0 +1,97 @@
+from flask import Blueprint, request, jsonify
+from bson import ObjectId
+from db import db, users
+from util.prefix_cache import PrefixCache
+from util.search_keys import search_key
+import re, traceback
+
+users_bp = Blueprint("users", __name__)
+
+# 접두사별로 캐시에 보관하는 최대 후보 수 (응답 limit의 상한이기도 함)
+MAX_CANDIDATES = 50
+DEFAULT_LIMIT = 10
+
+search_cache = PrefixCache(max_entries=4096, ttl=30)
+
+
+def _rank(doc, prefix):
+    """정확히 일치 > 로그인 ID 접두사 > 닉네임 접두사 순, 같은 그룹은 짧은 것 우선"""
+    id_lower = doc.get("idLower", "")
+    nickname_lower = doc.get("nicknameLower", "")
+    if id_lower == prefix or nickname_lower == prefix:
+        group = 0
+    elif id_lower.startswith(prefix):
+        group = 1
+    else:
+        group = 2
+    matched = id_lower if group < 2 else nickname_lower
+    return (group, len(matched), id_lower)
+
+
+def search_user_candidates(prefix, excluded=None):
+    """
+    로그인 ID / 닉네임 접두사 검색 결과(정렬됨)를 캐시 또는 DB에서 가져오기.
+    excluded(ObjectId 목록)가 있으면 쿼리에서 바로 제외하므로 캐시를 쓰지 않음
+    """
+    if not excluded:
+        cached = search_cache.get(prefix)
+        if cached is not None:
+            return cached
+
+    # ^로 고정된 접두사 정규식은 idLower / nicknameLower 인덱스 범위 스캔으로 처리됨
+    pattern = "^" + re.escape(prefix)
+    projection = {"id": 1, "nickname": 1, "idLower": 1, "nicknameLower": 1}
+    found = {}
+    for field in ["idLower", "nicknameLower"]:
+        query = {field: {"$regex": pattern}}
+        if excluded:
+            query["_id"] = {"$nin": list(excluded)}
+        cursor = users.find(query, projection) \
+            .sort(field, 1).limit(MAX_CANDIDATES)
+        for doc in cursor:
+            found[doc["_id"]] = doc
+
+    ranked = sorted(found.values(), key=lambda d: _rank(d, prefix))[:MAX_CANDIDATES]
+    candidates = [{
+        "_id": str(d["_id"]),
+        "id": d["id"],
+        "nickname": d.get("nickname", "")
+    } for d in ranked]
+
+    if not excluded:
+        search_cache.set(prefix, candidates)
+    return candidates
+
+
+# 사용자 검색 (초대용 자동완성)
+@users_bp.route("/users/search", methods=["GET"])
+def search_users():
+    try:
+        prefix = search_key(request.args.get("q", "").strip())
+        if not prefix:
+            return jsonify({"error": "q is required"}), 400
+
+        try:
+            limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+        limit = max(1, min(limit, MAX_CANDIDATES))
+
+        # roomId가 주어지면 이미 멤버이거나 초대된 사용자는 제외
+        excluded = []
+        room_id = request.args.get("roomId")
+        if room_id:
+            try:
+                room_oid = ObjectId(room_id)
+            except:
+                return jsonify({"error": "Invalid roomId"}), 400
+            room = db.rooms.find_one({"_id": room_oid}, {"members": 1, "pendingInvites": 1})
+            if not room:
+                return jsonify({"error": "Room not found"}), 404
+            excluded = room.get("members", []) + room.get("pendingInvites", [])
+
+        return jsonify(search_user_candidates(prefix, excluded)[:limit]), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,57 @@
+import math
+
+EARTH_RADIUS_M = 6371000
+
+
+def to_geojson_point(place_info):
+    """placeInfo의 lat / lng를 GeoJSON Point로 변환 (좌표가 없으면 None)"""
+    if not place_info:
+        return None
+    lat = place_info.get("lat")
+    lng = place_info.get("lng")
+    if lat is None or lng is None:
+        return None
+    # GeoJSON 좌표 순서는 [경도, 위도]
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
+
+
+def haversine_m(a, b):
+    """두 [lng, lat] 좌표 사이의 거리 (미터)"""
+    lng1, lat1 = map(math.radians, a)
+    lng2, lat2 = map(math.radians, b)
+    h = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
+
+
+def bounding_box(coords):
+    """[lng, lat] 목록의 경계 상자 (없으면 None)"""
+    if not coords:
+        return None
+    lngs = [c[0] for c in coords]
+    lats = [c[1] for c in coords]
+    return {
+        "sw": {"lat": min(lats), "lng": min(lngs)},
+        "ne": {"lat": max(lats), "lng": max(lngs)},
+    }
+
+
+def cluster_points(points, radius_m):
+    """
+    반경 radius_m 안의 장소끼리 묶는 단순 그리디 클러스터링.
+    points: [{"coordinates": [lng, lat], ...}] / 하루 일정 규모라 O(n^2)로 충분함
+    """
+    clusters = []
+    for p in points:
+        for c in clusters:
+            if haversine_m(c["center"], p["coordinates"]) <= radius_m:
+                c["members"].append(p)
+                n = len(c["members"])
+                c["center"] = [
+                    sum(m["coordinates"][0] for m in c["members"]) / n,
+                    sum(m["coordinates"][1] for m in c["members"]) / n,
+                ]
+                break
+        else:
+            clusters.append({"center": list(p["coordinates"]), "members": [p]})
+    return clusters
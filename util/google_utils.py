@@ -34,3 +34,92 @@ def get_place_info(place_name, country=None, city=None):
         "lat": loc.get("lat"),
         "lng": loc.get("lng")
     }
+
+
+def autocomplete_places(text, session_token=None, country_code=None, language="ko"):
+    """
+    Places Autocomplete 호출. 같은 session_token으로 이어지는 자동완성 요청과
+    마지막 get_place_details 호출은 하나의 세션으로 과금됨.
+    """
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_MAPS_API_KEY 환경변수가 설정되지 않았습니다.")
+
+    url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
+    params = {
+        "input": text,
+        "language": language,
+        "key": api_key
+    }
+    if session_token:
+        params["sessiontoken"] = session_token
+    if country_code:
+        params["components"] = f"country:{country_code}"
+
+    resp = requests.get(url, params=params, timeout=5)
+    data = resp.json()
+
+    if data.get("status") not in ("OK", "ZERO_RESULTS"):
+        raise RuntimeError(f"Places Autocomplete error: {data.get('status')}")
+
+    return [{
+        "place_id": p.get("place_id"),
+        "description": p.get("description"),
+        "main_text": p.get("structured_formatting", {}).get("main_text"),
+        "secondary_text": p.get("structured_formatting", {}).get("secondary_text")
+    } for p in data.get("predictions", [])]
+
+
+def get_place_details(place_id, session_token=None, language="ko"):
+    """place_id로 장소 정보 조회 (get_place_info와 같은 형식)"""
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_MAPS_API_KEY 환경변수가 설정되지 않았습니다.")
+
+    url = "https://maps.googleapis.com/maps/api/place/details/json"
+    params = {
+        "place_id": place_id,
+        "fields": "place_id,name,formatted_address,geometry",
+        "language": language,
+        "key": api_key
+    }
+    if session_token:
+        params["sessiontoken"] = session_token
+
+    resp = requests.get(url, params=params, timeout=5)
+    data = resp.json()
+
+    if data.get("status") != "OK" or not data.get("result"):
+        return None
+
+    place = data["result"]
+    loc = place["geometry"]["location"]
+
+    return {
+        "name": place.get("name"),
+        "address": place.get("formatted_address"),
+        "place_id": place.get("place_id"),
+        "lat": loc.get("lat"),
+        "lng": loc.get("lng")
+    }
+
+
+def close_place_session(place_id, session_token, language="ko"):
+    """
+    자동완성 세션 종료용 최소 Details 호출 (place_id 필드만 요청).
+    상세 정보를 캐시에서 찾았더라도 세션을 닫지 않으면 앞선 자동완성 요청이 건별로 과금됨.
+    """
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_MAPS_API_KEY 환경변수가 설정되지 않았습니다.")
+
+    url = "https://maps.googleapis.com/maps/api/place/details/json"
+    params = {
+        "place_id": place_id,
+        "fields": "place_id",
+        "language": language,
+        "sessiontoken": session_token,
+        "key": api_key
+    }
+    resp = requests.get(url, params=params, timeout=5)
+    return resp.json().get("status") == "OK"
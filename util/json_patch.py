@@ -0,0 +1,84 @@
+import copy
+
+
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(src, dst, path=""):
+    """src → dst 로 바꾸는 JSON Patch (RFC 6902의 add / remove / replace) 연산 목록 생성"""
+    if isinstance(src, dict) and isinstance(dst, dict):
+        ops = []
+        for key in src:
+            if key not in dst:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in dst.items():
+            if key not in src:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": copy.deepcopy(value)})
+            else:
+                ops.extend(make_patch(src[key], value, f"{path}/{_escape(key)}"))
+        return ops
+
+    if isinstance(src, list) and isinstance(dst, list):
+        # 앞뒤 공통 부분은 건너뛰어 중간 삽입/삭제가 한 번의 연산이 되도록 함
+        prefix = 0
+        while prefix < len(src) and prefix < len(dst) and src[prefix] == dst[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < len(src) - prefix and suffix < len(dst) - prefix
+               and src[-1 - suffix] == dst[-1 - suffix]):
+            suffix += 1
+        src_mid = src[prefix:len(src) - suffix]
+        dst_mid = dst[prefix:len(dst) - suffix]
+
+        ops = []
+        common = min(len(src_mid), len(dst_mid))
+        for i in range(common):
+            ops.extend(make_patch(src_mid[i], dst_mid[i], f"{path}/{prefix + i}"))
+        for i in reversed(range(common, len(src_mid))):
+            ops.append({"op": "remove", "path": f"{path}/{prefix + i}"})
+        for i in range(common, len(dst_mid)):
+            ops.append({"op": "add", "path": f"{path}/{prefix + i}", "value": copy.deepcopy(dst_mid[i])})
+        return ops
+
+    if src != dst or type(src) is not type(dst):
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(dst)}]
+    return []
+
+
+def apply_patch(doc, ops):
+    """JSON Patch 연산 목록을 적용한 새 문서 반환 (원본은 변경하지 않음)"""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        if op["path"] == "":
+            doc = copy.deepcopy(op.get("value"))
+            continue
+
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                parent.pop(index)
+            elif op["op"] == "replace":
+                parent[index] = copy.deepcopy(op["value"])
+            else:
+                raise ValueError(f"Unsupported patch op: {op['op']}")
+        else:
+            if op["op"] in ("add", "replace"):
+                parent[last] = copy.deepcopy(op["value"])
+            elif op["op"] == "remove":
+                del parent[last]
+            else:
+                raise ValueError(f"Unsupported patch op: {op['op']}")
+    return doc
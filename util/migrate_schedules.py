@@ -0,0 +1,73 @@
+"""
+embedded 방식 일정을 split 방식(schedule_items)으로 옮기는 온라인 마이그레이션.
+
+서버를 멈추지 않고 방 단위로 진행함:
+1. 방의 schedules 문서에서 현재 일정을 읽고
+2. 같은 내용을 schedule_items에 기록한 뒤 (storage가 바뀌기 전이라 아직 읽히지 않음)
+3. schedules 문서의 schedule이 1에서 읽은 내용과 같을 때만 storage를 split으로 바꾸고 schedule을 제거
+   (그 사이 일정이 수정됐으면 기록한 항목을 지우고 다시 시도)
+
+CLI: python -m util.migrate_schedules [--room <room_id>] [--dry-run] [--retries 3]
+"""
+from db import db
+from util.schedule_repository import to_item_docs
+from bson import ObjectId
+import argparse
+
+
+def migrate_room(room_oid, retries=3):
+    """방 하나를 split 방식으로 전환. 전환했으면 True"""
+    query = {"room_id": room_oid}
+    for _ in range(retries):
+        doc = db.schedules.find_one(query, {"schedule": 1, "storage": 1})
+        if not doc or doc.get("storage") == "split":
+            return False
+        schedule = doc.get("schedule", {})
+
+        db.schedule_items.delete_many(query)
+        items = []
+        for day, day_items in schedule.items():
+            items.extend(to_item_docs(room_oid, day, day_items))
+        if items:
+            db.schedule_items.insert_many(items)
+
+        result = db.schedules.update_one(
+            {**query, "storage": {"$ne": "split"}, "schedule": schedule},
+            {
+                # 이후 추가되는 일정은 날짜별 카운터에서 position을 받음
+                "$set": {"storage": "split", **{f"positions.{day}": len(day_items) for day, day_items in schedule.items()}},
+                "$unset": {"schedule": ""}
+            }
+        )
+        if result.modified_count:
+            return True
+
+    # 계속 수정 중인 방은 다음 실행에서 다시 시도
+    db.schedule_items.delete_many(query)
+    return False
+
+
+def migrate_all(dry_run=False, retries=3):
+    report = {"migrated": 0, "skipped": 0, "pending": 0}
+    cursor = db.schedules.find({"storage": {"$ne": "split"}}, {"room_id": 1})
+    for doc in cursor:
+        if dry_run:
+            report["pending"] += 1
+        elif migrate_room(doc["room_id"], retries):
+            report["migrated"] += 1
+        else:
+            report["skipped"] += 1
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate embedded schedules to split storage")
+    parser.add_argument("--room", help="migrate a single room")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.room:
+        print({"migrated": migrate_room(ObjectId(args.room), args.retries)})
+    else:
+        print(migrate_all(dry_run=args.dry_run, retries=args.retries))
@@ -0,0 +1,92 @@
+"""
+비밀번호 해시 / 검증을 요청 스레드가 아닌 별도 프로세스 풀에서 실행.
+
+scrypt 해시는 요청당 수십 ms의 CPU를 쓰므로, 로그인이 몰리면 웹 워커가 모두
+해시 계산에 묶여 다른 API까지 느려짐. 풀 크기와 대기열 길이를 제한하고,
+대기열이 가득 차거나 해시가 HASH_TIMEOUT 안에 끝나지 않으면 HashPoolBusy를 발생시켜
+503 + Retry-After로 응답함. 풀의 자식 프로세스가 죽으면(OOM 등) 풀을 새로 만들어 한 번 다시 시도함.
+
+환경변수
+- PASSWORD_HASH_METHOD: werkzeug 해시 방식 (기본 scrypt:32768:8:1)
+- PASSWORD_HASH_WORKERS: 해시 전용 프로세스 수 (기본 2)
+- PASSWORD_HASH_QUEUE: 동시에 대기할 수 있는 해시 작업 수 (기본 워커 수 x 4)
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+import multiprocessing, os, threading
+
+HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", HASH_WORKERS * 4))
+# 대기열 자리가 날 때까지 기다리는 최대 시간(초)
+QUEUE_WAIT = 2
+HASH_TIMEOUT = 10
+
+
+class HashPoolBusy(Exception):
+    """해시 대기열이 가득 찼거나 제시간에 처리하지 못한 경우"""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_QUEUE)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 요청 스레드가 여럿인 프로세스를 fork하지 않도록 spawn 사용
+            _pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool(broken):
+    """깨진 풀을 버림 (다른 스레드가 이미 새로 만들었으면 그대로 둠)"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=QUEUE_WAIT):
+        raise HashPoolBusy()
+    try:
+        for attempt in range(2):
+            pool = _get_pool()
+            try:
+                future = pool.submit(fn, *args)
+                return future.result(timeout=HASH_TIMEOUT)
+            except BrokenProcessPool:
+                _reset_pool(pool)
+                if attempt == 1:
+                    raise HashPoolBusy()
+            except FutureTimeout:
+                future.cancel()
+                raise HashPoolBusy()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+# werkzeug는 "scrypt" → "scrypt:32768:8:1"처럼 기본값을 채운 방식 문자열을 저장하므로
+# 설정값 그대로가 아니라 실제 해시의 접두사와 비교해야 함 (프로세스당 한 번 계산)
+HASH_PREFIX = generate_password_hash("", HASH_METHOD).split("$", 1)[0]
+
+
+def needs_rehash(password_hash):
+    """저장된 해시의 방식 / 비용 파라미터가 현재 설정과 다른지 확인"""
+    return password_hash.split("$", 1)[0] != HASH_PREFIX
@@ -0,0 +1,143 @@
+"""
+장소 자동완성 / 상세 조회 캐시.
+
+- 자동완성 결과는 (국가, 입력 접두사) 기준으로 모든 사용자 / 방이 공유함
+  (프로세스 메모리 캐시 → place_autocomplete_cache 컬렉션 → Google 순으로 조회)
+- place_id 상세 정보는 place_details_cache 컬렉션에 보관 (Google 정책상 좌표는 30일까지)
+- Google 호출이 필요할 때만 Maps 호출 한도를 확인하고 사용량을 기록함
+- 자동완성 캐시를 놓쳐 Google에 보낸 세션 토큰은 place_sessions 컬렉션에 기록해 두고,
+  상세 정보가 캐시에 있을 때는 그런 세션만 최소 필드 Details 호출로 닫음
+  (닫지 않으면 세션의 자동완성 요청이 건별로 과금됨. 모두 캐시에서 처리된 세션은 닫을 필요 없음)
+"""
+from datetime import datetime, timedelta, timezone
+from db import db
+from util.google_utils import autocomplete_places, get_place_details, close_place_session
+from util.prefix_cache import PrefixCache
+from util.rate_limit import acquire, record_usage
+import re, threading, traceback
+
+AUTOCOMPLETE_TTL = timedelta(days=1)
+DETAILS_TTL = timedelta(days=30)
+# 한도 초과 시 자동완성은 기다리지 않고, 상세 조회(일정 추가)는 잠시 기다림
+DETAILS_QUEUE_WAIT = 2
+# Google에 보낸 자동완성 세션 토큰 보관 시간 (그 뒤에는 Google에서도 세션이 끝난 것으로 봄)
+SESSION_TTL = timedelta(minutes=10)
+
+autocomplete_cache = PrefixCache(max_entries=8192, ttl=300)
+
+# 방의 country(자유 입력)를 Places API components 필터용 ISO 국가 코드로 변환
+COUNTRY_CODES = {
+    "대한민국": "kr", "한국": "kr", "korea": "kr", "south korea": "kr",
+    "일본": "jp", "japan": "jp",
+    "중국": "cn", "china": "cn",
+    "대만": "tw", "taiwan": "tw",
+    "홍콩": "hk", "hong kong": "hk",
+    "태국": "th", "thailand": "th",
+    "베트남": "vn", "vietnam": "vn",
+    "필리핀": "ph", "philippines": "ph",
+    "싱가포르": "sg", "singapore": "sg",
+    "말레이시아": "my", "malaysia": "my",
+    "인도네시아": "id", "indonesia": "id",
+    "미국": "us", "usa": "us", "united states": "us",
+    "캐나다": "ca", "canada": "ca",
+    "영국": "gb", "uk": "gb", "united kingdom": "gb",
+    "프랑스": "fr", "france": "fr",
+    "이탈리아": "it", "italy": "it",
+    "스페인": "es", "spain": "es",
+    "독일": "de", "germany": "de",
+    "호주": "au", "australia": "au",
+}
+
+
+def country_code_of(country):
+    if not country:
+        return None
+    key = country.strip().lower()
+    if re.fullmatch(r"[a-z]{2}", key):
+        return key
+    return COUNTRY_CODES.get(key)
+
+
+def normalize_input(text):
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+def autocomplete(text, country=None, session_token=None, room_id=None, user_id=None):
+    """자동완성 결과 (캐시 우선). 국가 코드를 모르면 입력에 국가명을 붙여 검색을 치우치게 함"""
+    code = country_code_of(country)
+    query = text if code or not country else f"{text} {country}"
+    cache_key = (normalize_input(query), code or "")
+
+    cached = autocomplete_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    doc_id = f"{cache_key[1]}:{cache_key[0]}"
+    doc = db.place_autocomplete_cache.find_one({"_id": doc_id}, {"predictions": 1})
+    if doc:
+        autocomplete_cache.set(cache_key, doc["predictions"])
+        return doc["predictions"]
+
+    acquire("maps", room_id=room_id, user_id=user_id)
+    record_usage("maps", room_id)
+    predictions = autocomplete_places(query, session_token=session_token, country_code=code)
+    if session_token:
+        db.place_sessions.update_one(
+            {"_id": session_token},
+            {"$set": {"expireAt": datetime.now(timezone.utc) + SESSION_TTL}},
+            upsert=True
+        )
+
+    db.place_autocomplete_cache.update_one(
+        {"_id": doc_id},
+        {"$set": {
+            "predictions": predictions,
+            "expireAt": datetime.now(timezone.utc) + AUTOCOMPLETE_TTL
+        }},
+        upsert=True
+    )
+    autocomplete_cache.set(cache_key, predictions)
+    return predictions
+
+
+def _close_session(place_id, session_token, room_id, user_id):
+    try:
+        acquire("maps", room_id=room_id, user_id=user_id)
+        record_usage("maps", room_id)
+        close_place_session(place_id, session_token)
+    except Exception:
+        traceback.print_exc()
+
+
+def place_details(place_id, session_token=None, room_id=None, user_id=None):
+    """place_id 상세 정보 (캐시 우선, get_place_info와 같은 형식)"""
+    # place_id는 캐시 문서의 _id로 쓰이므로 연산자 객체 등이 쿼리에 들어가지 않도록 확인
+    if not isinstance(place_id, str) or not place_id:
+        raise ValueError("place_id must be a non-empty string")
+    if session_token is not None and not isinstance(session_token, str):
+        raise ValueError("session_token must be a string")
+
+    # Google이 이 세션 토큰을 본 적이 있는지 (한 번만 닫도록 꺼내면서 지움)
+    open_session = bool(session_token) and db.place_sessions.find_one_and_delete(
+        {"_id": session_token}, projection={"_id": 1}
+    ) is not None
+
+    doc = db.place_details_cache.find_one({"_id": place_id}, {"place": 1})
+    if doc:
+        if open_session:
+            # 응답은 캐시로 바로 하고 세션 종료 호출은 백그라운드에서 처리
+            threading.Thread(
+                target=_close_session, args=(place_id, session_token, room_id, user_id), daemon=True
+            ).start()
+        return doc["place"]
+
+    acquire("maps", room_id=room_id, user_id=user_id, max_wait=DETAILS_QUEUE_WAIT)
+    record_usage("maps", room_id)
+    place = get_place_details(place_id, session_token=session_token)
+    if place:
+        db.place_details_cache.update_one(
+            {"_id": place_id},
+            {"$set": {"place": place, "expireAt": datetime.now(timezone.utc) + DETAILS_TTL}},
+            upsert=True
+        )
+    return place
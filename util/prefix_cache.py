@@ -0,0 +1,46 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PrefixCache:
+    """자주 조회되는 접두사 검색 결과를 프로세스 메모리에 보관하는 TTL + LRU 캐시"""
+
+    def __init__(self, max_entries=2048, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate_prefixes_of(self, word):
+        """word(정규화된 값)의 접두사인 캐시 항목 제거 (가입/탈퇴 시 사용)"""
+        if not word:
+            return
+        with self._lock:
+            for key in list(self._data):
+                prefix = key[0] if isinstance(key, tuple) else key
+                if word.startswith(prefix):
+                    del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,175 @@
+"""
+Gemini / Google Maps 호출에 대한 전역 / 방별 / 사용자별 호출 한도.
+
+각 버킷은 최대 capacity개의 토큰을 담고 초당 capacity / period개씩 연속으로 충전되는
+토큰 버킷이며, 모든 서버 프로세스가 rate_limits 컬렉션의 버킷 문서를 공유함
+(충전 + 차감을 파이프라인 업데이트 한 번으로 원자적으로 처리, 시각은 DB 서버 기준).
+매 호출마다 DB를 거치지 않도록 프로세스는 토큰을 몇 개씩 미리 예약(lease)해 두고
+로컬에서 소모하며, 소진된 버킷은 토큰이 충전될 때까지 DB 조회 없이 거절함.
+
+한도는 환경변수 RATE_LIMIT_<API>_<SCOPE>="횟수/초" 로 바꿀 수 있음
+(예: RATE_LIMIT_GEMINI_ROOM="5/3600").
+"""
+from bson import ObjectId
+from datetime import datetime, timezone
+from flask import jsonify
+from pymongo import ReturnDocument
+from db import db
+import math, os, threading, time
+
+DEFAULT_LIMITS = {
+    "gemini": {"global": (60, 60), "room": (10, 3600), "user": (20, 3600)},
+    "maps": {"global": (600, 60), "room": (120, 60), "user": (120, 60)},
+}
+# 한 번에 미리 예약하는 토큰 비율 (용량이 작은 버킷은 1개씩)
+LEASE_FRACTION = 0.05
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, api, scope, retry_after):
+        super().__init__(f"{api} {scope} rate limit exceeded")
+        self.api = api
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def _limit(api, scope):
+    override = os.getenv(f"RATE_LIMIT_{api.upper()}_{scope.upper()}")
+    if override:
+        count, period = override.split("/")
+        return int(count), int(period)
+    return DEFAULT_LIMITS[api][scope]
+
+
+class _LocalBuckets:
+    """프로세스 내 예약 토큰 / 소진 상태"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.leases = {}      # bucket_id -> (예약 만료 시각, 남은 토큰 수)
+        self.exhausted = {}   # bucket_id -> 다시 DB를 확인할 시각
+
+
+_local = _LocalBuckets()
+
+
+def _reserve(bucket_id, capacity, period, n):
+    """
+    DB 버킷에서 n개의 토큰을 원자적으로 꺼냄.
+    마지막 갱신 이후 경과 시간만큼 (capacity / period 속도로) 충전한 뒤, n개 이상이면 차감.
+    반환: 부족할 때 n개가 모일 때까지 남은 초 (성공하면 0)
+    """
+    rate = capacity / period
+    elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updatedAt", "$$NOW"]}]}, 1000]}
+    refilled = {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed, rate]}]}]}
+    doc = db.rate_limits.find_one_and_update(
+        {"_id": bucket_id},
+        [
+            {"$set": {"refilled": refilled}},
+            {"$set": {
+                "granted": {"$gte": ["$refilled", n]},
+                "updatedAt": "$$NOW",
+                # 가득 찰 때까지 사용이 없으면 버킷 문서는 필요 없으므로 TTL로 삭제
+                "expireAt": {"$add": ["$$NOW", period * 1000]},
+            }},
+            {"$set": {"tokens": {"$cond": ["$granted", {"$subtract": ["$refilled", n]}, "$refilled"]}}},
+            {"$unset": "refilled"},
+        ],
+        projection={"granted": 1, "tokens": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if doc["granted"]:
+        return 0
+    return max(1, math.ceil((n - doc["tokens"]) / rate))
+
+
+def _take(bucket_id, capacity, period):
+    """토큰 1개 사용. 성공하면 0, 실패하면 토큰이 충전될 때까지 남은 초"""
+    now = time.monotonic()
+    with _local.lock:
+        retry_at = _local.exhausted.get(bucket_id, 0)
+        if retry_at > now:
+            return math.ceil(retry_at - now)
+        expires_at, tokens = _local.leases.get(bucket_id, (0, 0))
+        if expires_at > now and tokens > 0:
+            _local.leases[bucket_id] = (expires_at, tokens - 1)
+            return 0
+
+    chunk = max(1, int(capacity * LEASE_FRACTION))
+    retry_after = 0
+    for n in ([chunk, 1] if chunk > 1 else [1]):
+        retry_after = _reserve(bucket_id, capacity, period, n)
+        if not retry_after:
+            with _local.lock:
+                # 예약한 토큰은 한 충전 주기 안에서만 로컬로 사용 (오래 쌓아두지 않음)
+                _local.leases[bucket_id] = (now + period * LEASE_FRACTION, n - 1)
+            return 0
+
+    with _local.lock:
+        _local.exhausted[bucket_id] = now + retry_after
+    return retry_after
+
+
+def _refund(bucket_id, capacity):
+    """다른 범위에서 거절돼 쓰지 않은 토큰 1개를 DB 버킷에 되돌림 (용량을 넘지 않도록)"""
+    db.rate_limits.update_one(
+        {"_id": bucket_id},
+        [{"$set": {"tokens": {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, 1]}]}}}]
+    )
+
+
+def acquire(api, room_id=None, user_id=None, max_wait=0):
+    """
+    api 호출 1회에 대한 토큰 확보. 사용자 → 방 → 전역 순으로 확인해
+    한 방의 과도한 호출이 전역 한도를 먼저 소모하지 않도록 함.
+    뒤 범위에서 거절되면 앞에서 꺼낸 토큰은 DB 버킷에 되돌림.
+    한도 초과 시 충전까지 max_wait초 이내면 잠시 대기 후 재시도, 아니면 RateLimitExceeded.
+    """
+    scopes = []
+    if user_id:
+        scopes.append(("user", str(user_id)))
+    if room_id:
+        scopes.append(("room", str(room_id)))
+    scopes.append(("global", "all"))
+
+    deadline = time.monotonic() + max_wait
+    while True:
+        taken = []
+        for scope, key in scopes:
+            capacity, period = _limit(api, scope)
+            bucket_id = f"{api}:{scope}:{key}"
+            retry_after = _take(bucket_id, capacity, period)
+            if retry_after:
+                break
+            taken.append((bucket_id, capacity))
+        else:
+            return
+
+        # 거절된 호출이 앞 범위(방 / 사용자)의 토큰을 소모하지 않도록 모든 프로세스가 보는 버킷에 반환
+        for bucket_id, capacity in taken:
+            _refund(bucket_id, capacity)
+        if time.monotonic() + retry_after > deadline:
+            raise RateLimitExceeded(api, scope, retry_after)
+        time.sleep(retry_after)
+
+
+def record_usage(api, room_id, units=1):
+    """방별 / 일별 외부 API 사용량 누적"""
+    if not room_id:
+        return
+    db.api_usage.update_one(
+        {"room_id": ObjectId(room_id), "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")},
+        {"$inc": {api: units}},
+        upsert=True
+    )
+
+
+def too_many_requests(e):
+    """RateLimitExceeded → 429 + Retry-After 응답"""
+    response = jsonify({
+        "error": f"Too many {e.api} requests ({e.scope} limit), retry later",
+        "retryAfter": e.retry_after
+    })
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 429
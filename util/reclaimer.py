@@ -0,0 +1,324 @@
+"""
+삭제된 방 / 탈퇴한 사용자가 남긴 데이터를 백그라운드에서 정리하는 작업.
+
+- 삭제 라우트는 cleanup_jobs 컬렉션에 작업만 넣고(enqueue_cleanup) 바로 응답함
+- 각 서버 프로세스의 워커 스레드가 작업을 하나씩 가져가(lease) 처리함
+- reclaim_orphans()는 큐에 들어오지 못한 고아 데이터(GridFS 이미지/청크, 일정,
+  멤버십)를 배치 단위로 찾아 정리하고 회수한 바이트 수를 보고함
+
+CLI: python -m util.reclaimer [--dry-run] [--rate 50] [--batch 500]
+"""
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from db import db, fs
+import argparse, os, threading, time, traceback
+
+# 업로드 직후 아직 방 문서에 연결되지 않은 이미지를 지우지 않도록 하는 유예 시간
+ORPHAN_GRACE = timedelta(hours=1)
+JOB_LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+# 실패한 작업은 RETRY_BACKOFF x 2^(시도 횟수-1) 뒤에 다시 시도
+RETRY_BACKOFF = timedelta(seconds=30)
+
+
+class Throttle:
+    """초당 처리 건수를 max_per_sec 이하로 유지 (0이면 제한 없음)"""
+
+    def __init__(self, max_per_sec=0):
+        self.max_per_sec = max_per_sec
+        self._started = time.monotonic()
+        self._count = 0
+
+    def wait(self, ops=1):
+        if not self.max_per_sec:
+            return
+        self._count += ops
+        ahead = self._count / self.max_per_sec - (time.monotonic() - self._started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+# -----------------------
+# 작업 큐
+# -----------------------
+def enqueue_cleanup(kind, target, **payload):
+    """정리 작업 등록. kind: "room" | "image" | "user" """
+    db.cleanup_jobs.insert_one({
+        "kind": kind,
+        "target": target,
+        "payload": payload,
+        "status": "pending",
+        "attempts": 0,
+        "createdAt": _now(),
+        "notBefore": _now(),
+    })
+
+
+def _claim_job():
+    now = _now()
+    return db.cleanup_jobs.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "notBefore": {"$lte": now}},
+            {"status": "running", "leaseUntil": {"$lt": now}},
+        ]},
+        {"$set": {"status": "running", "leaseUntil": now + JOB_LEASE}, "$inc": {"attempts": 1}},
+        sort=[("createdAt", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _delete_image(image_id, report, dry_run=False):
+    file_doc = db.fs.files.find_one({"_id": image_id}, {"length": 1})
+    if not file_doc:
+        return
+    report["images"] += 1
+    report["bytes"] += file_doc.get("length", 0)
+    if not dry_run:
+        # GridFS delete는 files 문서와 chunks를 함께 삭제함
+        fs.delete(image_id)
+
+
+def _delete_room_data(room_oid, report, dry_run=False):
+    """방에 딸린 일정 / 좌표 / 리비전 삭제"""
+    for name in ["schedules", "schedule_items", "schedule_places", "schedule_revisions"]:
+        sizes = list(db[name].aggregate([
+            {"$match": {"room_id": room_oid}},
+            {"$project": {"size": {"$bsonSize": "$$ROOT"}}}
+        ]))
+        report[name] += len(sizes)
+        report["bytes"] += sum(s["size"] for s in sizes)
+        if sizes and not dry_run:
+            db[name].delete_many({"room_id": room_oid})
+
+
+def _delete_room(room, report, dry_run=False):
+    report["rooms"] += 1
+    if not dry_run:
+        db.rooms.delete_one({"_id": room["_id"]})
+    _delete_room_data(room["_id"], report, dry_run)
+    if room.get("imageId"):
+        _delete_image(room["imageId"], report, dry_run)
+
+
+def _release_user(user_oid, report, dry_run=False):
+    """탈퇴한 사용자를 모든 방의 멤버 / 초대 목록에서 제거하고, 소유한 방은 넘기거나 삭제"""
+    for room in db.rooms.find({"ownerId": user_oid}, {"members": 1, "imageId": 1}):
+        heirs = [m for m in room.get("members", []) if m != user_oid]
+        if heirs:
+            report["ownersTransferred"] += 1
+            if not dry_run:
+                db.rooms.update_one({"_id": room["_id"]}, {"$set": {"ownerId": heirs[0]}})
+        else:
+            _delete_room(room, report, dry_run)
+
+    query = {"$or": [{"members": user_oid}, {"pendingInvites": user_oid}]}
+    if dry_run:
+        report["memberships"] += db.rooms.count_documents(query)
+    else:
+        result = db.rooms.update_many(query, {"$pull": {"members": user_oid, "pendingInvites": user_oid}})
+        report["memberships"] += result.modified_count
+
+
+def _run_job(job, report):
+    kind = job["kind"]
+    if kind == "image":
+        _delete_image(job["target"], report)
+    elif kind == "room":
+        _delete_room_data(job["target"], report)
+        if job.get("payload", {}).get("imageId"):
+            _delete_image(job["payload"]["imageId"], report)
+    elif kind == "user":
+        _release_user(job["target"], report)
+    else:
+        raise ValueError(f"Unknown cleanup job kind: {kind}")
+
+
+def process_pending_jobs(max_jobs=100, max_per_sec=10):
+    """대기 중인 정리 작업 처리, 처리한 작업 수 반환"""
+    throttle = Throttle(max_per_sec)
+    processed = 0
+    while processed < max_jobs:
+        job = _claim_job()
+        if not job:
+            break
+        report = new_report()
+        try:
+            _run_job(job, report)
+            db.cleanup_jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": "done", "finishedAt": _now(), "report": report}}
+            )
+        except Exception as e:
+            traceback.print_exc()
+            if job["attempts"] >= MAX_ATTEMPTS:
+                update = {"status": "failed", "error": str(e), "finishedAt": _now()}
+            else:
+                # 바로 다시 가져가지 않도록 대기 시간을 두고 재시도
+                update = {
+                    "status": "pending",
+                    "error": str(e),
+                    "notBefore": _now() + RETRY_BACKOFF * 2 ** (job["attempts"] - 1)
+                }
+            db.cleanup_jobs.update_one({"_id": job["_id"]}, {"$set": update})
+        processed += 1
+        throttle.wait()
+    return processed
+
+
+def _worker_loop(interval, max_per_sec):
+    while True:
+        try:
+            process_pending_jobs(max_per_sec=max_per_sec)
+        except Exception:
+            traceback.print_exc()
+        time.sleep(interval)
+
+
+_worker_started = False
+_worker_lock = threading.Lock()
+
+
+def start_reclaimer():
+    """프로세스당 한 번 정리 워커 스레드 시작 (RECLAIMER_INTERVAL=0 이면 비활성)"""
+    global _worker_started
+    interval = float(os.getenv("RECLAIMER_INTERVAL", 30))
+    max_per_sec = float(os.getenv("RECLAIMER_RATE", 10))
+    if interval <= 0:
+        return
+    with _worker_lock:
+        if _worker_started:
+            return
+        _worker_started = True
+    threading.Thread(target=_worker_loop, args=(interval, max_per_sec), daemon=True).start()
+
+
+# -----------------------
+# 고아 데이터 전체 스캔
+# -----------------------
+def new_report():
+    return {
+        "images": 0, "chunks": 0, "rooms": 0, "schedules": 0, "schedule_items": 0, "schedule_places": 0,
+        "schedule_revisions": 0, "memberships": 0, "ownersTransferred": 0, "bytes": 0
+    }
+
+
+def _batched(cursor, batch_size):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _reclaim_images(report, dry_run, batch_size, throttle):
+    cutoff = _now() - ORPHAN_GRACE
+    cursor = db.fs.files.find({"uploadDate": {"$lt": cutoff}}, {"_id": 1}).sort("_id", 1)
+    for batch in _batched(cursor, batch_size):
+        ids = [f["_id"] for f in batch]
+        used = {r["imageId"] for r in db.rooms.find({"imageId": {"$in": ids}}, {"imageId": 1})}
+        orphans = [i for i in ids if i not in used]
+        for image_id in orphans:
+            _delete_image(image_id, report, dry_run)
+        throttle.wait(len(orphans))
+
+    # files 문서 없이 남은 청크 (업로드 실패 등).
+    # GridFS는 청크를 먼저 쓰고 files 문서를 마지막에 쓰므로 업로드 중인 파일을 건드리지 않도록
+    # files_id(ObjectId)의 생성 시각이 유예 시간 이전인 것만 (files_id, n) 인덱스 범위로 훑음
+    cutoff_id = ObjectId.from_datetime(cutoff)
+    last = None
+    while True:
+        id_range = {"$lt": cutoff_id}
+        if last is not None:
+            id_range["$gt"] = last
+        cursor = db.fs.chunks.find({"files_id": id_range}, {"_id": 0, "files_id": 1, "n": 1}) \
+            .sort([("files_id", 1), ("n", 1)]).limit(batch_size)
+        page = list(dict.fromkeys(c["files_id"] for c in cursor))
+        if not page:
+            break
+        last = page[-1]
+
+        alive = {f["_id"] for f in db.fs.files.find({"_id": {"$in": page}}, {"_id": 1})}
+        orphans = [file_id for file_id in page if file_id not in alive]
+        if not orphans:
+            continue
+        # 데이터 크기는 고아 청크에 대해서만 계산
+        for c in db.fs.chunks.aggregate([
+            {"$match": {"files_id": {"$in": orphans}}},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "bytes": {"$sum": {"$binarySize": "$data"}}}}
+        ]):
+            report["chunks"] += c["count"]
+            report["bytes"] += c["bytes"]
+        if not dry_run:
+            db.fs.chunks.delete_many({"files_id": {"$in": orphans}})
+        throttle.wait(len(orphans))
+
+
+def _reclaim_room_data(report, dry_run, batch_size, throttle):
+    """
+    존재하지 않는 방을 가리키는 일정 / 좌표 / 리비전 삭제.
+    컬렉션마다 room_id 인덱스를 범위 조건($gt 마지막 room_id)으로 페이지 단위로 훑음
+    """
+    for name in ["schedules", "schedule_items", "schedule_places", "schedule_revisions"]:
+        last = None
+        while True:
+            query = {"room_id": {"$gt": last}} if last else {}
+            cursor = db[name].find(query, {"_id": 0, "room_id": 1}).sort("room_id", 1).limit(batch_size)
+            page = list(dict.fromkeys(d["room_id"] for d in cursor))
+            if not page:
+                break
+            last = page[-1]
+
+            alive = {r["_id"] for r in db.rooms.find({"_id": {"$in": page}}, {"_id": 1})}
+            orphans = [room_oid for room_oid in page if room_oid not in alive]
+            for room_oid in orphans:
+                _delete_room_data(room_oid, report, dry_run)
+            throttle.wait(len(orphans))
+
+
+def _reclaim_memberships(report, dry_run, batch_size, throttle):
+    """탈퇴한 사용자의 멤버십 / 초대 / 방장 정리"""
+    cursor = db.rooms.find({}, {"ownerId": 1, "members": 1, "pendingInvites": 1}).sort("_id", 1)
+    released = set()
+    for batch in _batched(cursor, batch_size):
+        user_ids = set()
+        for room in batch:
+            user_ids.add(room["ownerId"])
+            user_ids.update(room.get("members", []))
+            user_ids.update(room.get("pendingInvites", []))
+        alive = {u["_id"] for u in db.users.find({"_id": {"$in": list(user_ids)}}, {"_id": 1})}
+        missing = user_ids - alive - released
+        released.update(missing)
+        for user_oid in missing:
+            _release_user(user_oid, report, dry_run)
+        throttle.wait(len(missing))
+
+
+def reclaim_orphans(dry_run=False, batch_size=500, max_per_sec=50):
+    """
+    고아 데이터 전체 스캔 및 정리. dry_run이면 삭제하지 않고 집계만 함.
+    max_per_sec: 초당 삭제 건수 상한 (0이면 제한 없음)
+    """
+    report = new_report()
+    throttle = Throttle(max_per_sec)
+    _reclaim_memberships(report, dry_run, batch_size, throttle)
+    _reclaim_room_data(report, dry_run, batch_size, throttle)
+    _reclaim_images(report, dry_run, batch_size, throttle)
+    report["dryRun"] = dry_run
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reclaim orphaned TripRoom data")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--rate", type=float, default=50, help="max deletions per second (0 = unlimited)")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    print(reclaim_orphans(dry_run=args.dry_run, batch_size=args.batch, max_per_sec=args.rate))
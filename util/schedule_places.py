@@ -0,0 +1,103 @@
+from bson import ObjectId
+from pymongo import ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError
+from db import db
+from util.geo_utils import to_geojson_point
+from util.schedule_repository import get_schedule_repository
+import traceback
+
+# 좌표 반영 중 일정이 계속 바뀌면 다시 읽는 최대 횟수 (마지막 쓰기 요청이 최종 상태를 반영함)
+SYNC_ATTEMPTS = 5
+
+
+def item_location(item):
+    """일정 항목의 GeoJSON 좌표 (add는 placeInfo, update는 place_info 키를 사용함)"""
+    return item.get("location") or to_geojson_point(item.get("placeInfo") or item.get("place_info"))
+
+
+def _place_ops(key, items):
+    ops = []
+    for index, item in enumerate(items):
+        location = item_location(item)
+        if not location:
+            ops.append(DeleteOne({**key, "index": index}))
+            continue
+        info = item.get("placeInfo") or item.get("place_info") or {}
+        ops.append(ReplaceOne({**key, "index": index}, {
+            **key,
+            "index": index,
+            "title": item.get("title"),
+            "place": item.get("place"),
+            "placeId": info.get("place_id"),
+            "startHour": item.get("startHour"),
+            "startMinute": item.get("startMinute"),
+            "location": location,
+        }, upsert=True))
+    ops.append(DeleteMany({**key, "index": {"$gte": len(items)}}))
+    return ops
+
+
+def _write_ops(ops, retries=3):
+    for attempt in range(retries):
+        try:
+            db.schedule_places.bulk_write(ops, ordered=True)
+            return
+        except BulkWriteError as e:
+            # 동시 upsert가 고유 인덱스에 걸린 경우만 이미 생긴 행을 교체하도록 다시 시도
+            duplicate = all(err.get("code") == 11000 for err in e.details.get("writeErrors", []))
+            if not duplicate or attempt == retries - 1:
+                raise
+
+
+def _current_revision(room_oid):
+    doc = db.schedules.find_one({"room_id": room_oid}, {"revision": 1})
+    return doc.get("revision") if doc else None
+
+
+def _sync(room_id, read, build_ops):
+    """
+    쓰기가 끝난 뒤 저장된 일정을 다시 읽어 좌표를 반영하고, 그 사이 다른 쓰기로 revision이
+    바뀌었으면 다시 읽어 반영함 (늦게 끝난 요청이 더 오래된 좌표로 덮어쓰지 않도록).
+    좌표 반영은 일정 쓰기 이후의 부가 작업이므로 실패해도 예외를 올리지 않고,
+    방을 placesStale로 표시해 다음 좌표 조회 때 방 전체를 다시 채우게 함
+    """
+    room_oid = ObjectId(room_id)
+    try:
+        for _ in range(SYNC_ATTEMPTS):
+            data, revision = read(get_schedule_repository(room_oid))
+            _write_ops(build_ops(room_oid, data))
+            if _current_revision(room_oid) == revision:
+                return
+    except Exception:
+        traceback.print_exc()
+        db.schedules.update_one({"room_id": room_oid}, {"$set": {"placesStale": True}})
+
+
+def sync_day_places(room_id, day):
+    """
+    하루치 일정의 좌표를 2dsphere 인덱스가 걸린 schedule_places 컬렉션에 반영.
+    (room_id, day, index) 고유 키로 항목별 교체하므로 같은 날짜를 동시에 고쳐도 행이 중복되지 않음
+    """
+    day = str(day)
+    _sync(
+        room_id,
+        lambda repository: repository.read_day(day),
+        lambda room_oid, items: _place_ops({"room_id": room_oid, "day": day}, items or [])
+    )
+
+
+def _room_ops(room_oid, schedule):
+    schedule = schedule or {}
+    ops = [DeleteMany({"room_id": room_oid, "day": {"$nin": [str(d) for d in schedule]}})]
+    for day, items in schedule.items():
+        ops.extend(_place_ops({"room_id": room_oid, "day": str(day)}, items or []))
+    return ops
+
+
+def sync_room_places(room_id):
+    """방 전체 일정 좌표 재구성 (AI 피드백처럼 일정 전체가 바뀌는 경우)"""
+    _sync(room_id, lambda repository: repository.read_schedule(), _room_ops)
+
+
+def delete_room_places(room_id):
+    db.schedule_places.delete_many({"room_id": ObjectId(room_id)})
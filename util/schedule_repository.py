@@ -0,0 +1,359 @@
+"""
+방 일정 저장소.
+
+- embedded: schedules 문서 하나의 schedule.<day> 배열에 모든 일정을 저장 (기존 방식)
+- split: 일정 하나당 schedule_items 문서 하나, (room_id, day, position) 순서로 정렬.
+  schedules 문서에는 피드백 / 리비전 같은 방 단위 메타데이터만 남음.
+  일정 하나를 고칠 때 방 전체 일정이 아니라 해당 문서만 읽고 씀.
+
+방마다 schedules.storage 필드로 방식을 구분하므로 방 단위로 옮겨갈 수 있음
+(util.migrate_schedules 참고). 새로 일정을 만드는 방은 SCHEDULE_STORAGE 환경변수를 따름.
+
+쓰기는 read_day / read_schedule로 읽은 시점의 schedules.revision을 함께 받아,
+그 사이 다른 쓰기가 없었을 때만 적용하고 같은 연산에서 revision을 1 올림 (새 revision 반환).
+저장소를 고른 뒤 방이 다른 방식으로 바뀌었거나, 다른 쓰기가 먼저 반영됐거나,
+대상 일정이 사라졌으면 쓰기를 하지 않고 ScheduleConflict를 던짐 (라우트는 409로 응답).
+"""
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db import db
+import os, time
+
+DEFAULT_STORAGE = os.getenv("SCHEDULE_STORAGE", "embedded")
+# split 방식 쓰기 중 표시 (서버가 쓰기 도중 죽어도 이 시간이 지나면 다른 요청이 쓸 수 있음)
+WRITE_LEASE = timedelta(seconds=10)
+READ_RETRIES = 40
+READ_RETRY_DELAY = 0.05
+
+
+class ScheduleConflict(Exception):
+    """일정이 동시에 수정 / 마이그레이션되어 요청한 쓰기를 적용할 수 없음"""
+
+
+def item_start(item):
+    """정렬 / 시간 검색용 시작 시각 (분)"""
+    return (item.get("startHour") or 0) * 60 + (item.get("startMinute") or 0)
+
+
+def to_item_docs(room_oid, day, items, first_position=0):
+    return [{
+        "room_id": room_oid,
+        "day": str(day),
+        "position": first_position + i,
+        "start": item_start(item),
+        "item": item,
+    } for i, item in enumerate(items)]
+
+
+def revision_filter(revision):
+    """읽은 시점의 revision과 같을 때만 쓰기 (문서가 없었으면 revision 필드가 없어야 함)"""
+    return {"revision": revision if revision is not None else {"$exists": False}}
+
+
+def _next_revision(revision):
+    return (revision or 0) + 1
+
+
+class EmbeddedScheduleRepository:
+    storage = "embedded"
+
+    def __init__(self, room_oid):
+        self.room_oid = room_oid
+        self.query = {"room_id": room_oid}
+        # 쓰기는 아직 split으로 바뀌지 않은 문서에만 적용 (마이그레이션 이후의 쓰기가 사라지지 않도록)
+        self.write_query = {"room_id": room_oid, "storage": {"$ne": SplitScheduleRepository.storage}}
+
+    def _conflict(self):
+        return ScheduleConflict(f"Schedule of room {self.room_oid} was changed by another request")
+
+    def _check(self, result, revision):
+        if result.matched_count == 0:
+            raise self._conflict()
+        return _next_revision(revision)
+
+    def get_document(self):
+        """schedules 문서 전체 (schedule 포함), 없으면 None"""
+        return db.schedules.find_one(self.query)
+
+    def get_schedule(self):
+        doc = db.schedules.find_one(self.query, {"schedule": 1})
+        return None if doc is None else doc.get("schedule", {})
+
+    def get_day(self, day):
+        doc = db.schedules.find_one(self.query, {f"schedule.{day}": 1})
+        return None if doc is None else doc.get("schedule", {}).get(day, [])
+
+    def read_schedule(self):
+        """(전체 일정, revision), 문서가 없으면 (None, None)"""
+        doc = db.schedules.find_one(self.query, {"schedule": 1, "revision": 1})
+        if doc is None:
+            return None, None
+        return doc.get("schedule", {}), doc.get("revision")
+
+    def read_day(self, day):
+        """(해당 날짜 일정, revision), 문서가 없으면 (None, None)"""
+        doc = db.schedules.find_one(self.query, {f"schedule.{day}": 1, "revision": 1})
+        if doc is None:
+            return None, None
+        return doc.get("schedule", {}).get(day, []), doc.get("revision")
+
+    def add_item(self, day, item, revision):
+        """일정 추가, 새 revision 반환"""
+        try:
+            updated = db.schedules.find_one_and_update(
+                {**self.write_query, **revision_filter(revision)},
+                {"$push": {f"schedule.{day}": item}, "$inc": {"revision": 1}},
+                projection={"revision": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # 조건이 맞지 않아 upsert가 room_id 고유 인덱스에 걸림 (다른 쓰기 / split 전환)
+            raise self._conflict()
+        return updated["revision"]
+
+    def replace_item(self, day, index, item, revision):
+        return self._check(db.schedules.update_one(
+            {**self.write_query, **revision_filter(revision), f"schedule.{day}.{index}": {"$exists": True}},
+            {"$set": {f"schedule.{day}.{index}": item}, "$inc": {"revision": 1}}
+        ), revision)
+
+    def delete_item(self, day, index, revision):
+        # 배열에서 index 위치 하나만 빼는 연산이 없으므로 앞 / 뒤 구간을 이어 붙임
+        path = f"$schedule.{day}"
+        return self._check(db.schedules.update_one(
+            {**self.write_query, **revision_filter(revision), f"schedule.{day}.{index}": {"$exists": True}},
+            [{"$set": {
+                f"schedule.{day}": {"$concatArrays": [
+                    {"$slice": [path, index]},
+                    {"$slice": [path, index + 1, {"$max": [1, {"$size": path}]}]}
+                ]},
+                "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]}
+            }}]
+        ), revision)
+
+    def replace_schedule(self, schedule, meta=None, revision=None):
+        try:
+            db.schedules.update_one(
+                {**self.write_query, **revision_filter(revision)},
+                {"$set": {"schedule": schedule, **(meta or {})}, "$inc": {"revision": 1}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            raise self._conflict()
+        return _next_revision(revision)
+
+    def delete_all(self):
+        """일정 전체 삭제, 삭제할 일정이 있었으면 True"""
+        if db.schedules.delete_one(self.write_query).deleted_count:
+            return True
+        if db.schedules.find_one(self.query, {"_id": 1}):
+            raise ScheduleConflict(f"Schedule of room {self.room_oid} changed storage")
+        return False
+
+
+class SplitScheduleRepository:
+    """
+    일정 문서와 revision이 다른 컬렉션에 있으므로, 쓰기 전에 schedules 문서에서
+    revision을 올리면서 writingUntil(쓰기 중 표시)을 걸고, 항목을 쓴 뒤 표시를 지움.
+    읽기는 쓰기 중이 아닐 때 revision → 항목 → revision 순으로 읽어 중간에 바뀌었으면 다시 읽음.
+    """
+    storage = "split"
+
+    def __init__(self, room_oid):
+        self.room_oid = room_oid
+        self.query = {"room_id": room_oid}
+
+    def _begin_write(self, revision, meta=None):
+        """revision을 올리고 쓰기 중 표시, 새 revision 반환"""
+        now = datetime.now(timezone.utc)
+        update = {
+            "$inc": {"revision": 1},
+            "$set": {"writingUntil": now + WRITE_LEASE, **(meta or {})},
+            "$setOnInsert": {"storage": self.storage},
+        }
+        try:
+            doc = db.schedules.find_one_and_update(
+                {
+                    **self.query, **revision_filter(revision),
+                    "$or": [{"writingUntil": {"$exists": False}}, {"writingUntil": {"$lt": now}}]
+                },
+                update,
+                projection={"revision": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise ScheduleConflict(f"Schedule of room {self.room_oid} was changed by another request")
+        return doc["revision"]
+
+    def _end_write(self, revision):
+        db.schedules.update_one({**self.query, "revision": revision}, {"$unset": {"writingUntil": ""}})
+
+    def _allocate(self, counts):
+        """
+        날짜별로 새 position 구간을 예약. counts: {day: 개수} → {day: 첫 position}
+        schedules 문서의 positions.<day> 카운터를 $inc로 올리므로 동시에 추가해도 겹치지 않음
+        """
+        if not counts:
+            return {}
+        doc = db.schedules.find_one_and_update(
+            self.query,
+            {"$inc": {f"positions.{day}": n for day, n in counts.items()}},
+            projection={"positions": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        positions = doc.get("positions", {})
+        return {day: positions[day] - n for day, n in counts.items()}
+
+    def _resync_counter(self, day):
+        """카운터가 없던 (이전에 옮겨진) 방은 실제 마지막 position 다음으로 카운터를 맞춤"""
+        last = db.schedule_items.find_one({**self.query, "day": day}, {"position": 1}, sort=[("position", -1)])
+        if last:
+            db.schedules.update_one(self.query, {"$max": {f"positions.{day}": last["position"] + 1}})
+
+    def _nth(self, day, index):
+        """position 순서로 index번째 일정 문서 (position에는 삭제로 생긴 빈 번호가 있을 수 있음)"""
+        docs = list(db.schedule_items.find({**self.query, "day": str(day)}, {"_id": 1})
+                    .sort("position", 1).skip(index).limit(1))
+        if not docs:
+            raise ScheduleConflict(f"Item {index} on day {day} no longer exists")
+        return docs[0]["_id"]
+
+    def _assemble(self, cursor):
+        schedule = {}
+        for doc in cursor:
+            schedule.setdefault(doc["day"], []).append(doc["item"])
+        return schedule
+
+    @staticmethod
+    def _writing(meta):
+        until = meta.get("writingUntil")
+        return until is not None and until.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+
+    def _consistent_read(self, read_items):
+        """쓰기 중이 아닌 같은 revision 사이에서 읽은 항목만 반환, (항목, revision)"""
+        for _ in range(READ_RETRIES):
+            meta = db.schedules.find_one(self.query, {"revision": 1, "writingUntil": 1})
+            if meta is None:
+                return None, None
+            if not self._writing(meta):
+                items = read_items()
+                after = db.schedules.find_one(self.query, {"revision": 1, "writingUntil": 1})
+                if after and after.get("revision") == meta.get("revision") and not self._writing(after):
+                    return items, meta.get("revision")
+            time.sleep(READ_RETRY_DELAY)
+        raise ScheduleConflict(f"Schedule of room {self.room_oid} is being changed, retry later")
+
+    def get_document(self):
+        doc = db.schedules.find_one(self.query)
+        if doc is None:
+            return None
+        doc["schedule"] = self.get_schedule()
+        return doc
+
+    def get_schedule(self):
+        return self.read_schedule()[0]
+
+    def get_day(self, day):
+        return self.read_day(day)[0]
+
+    def _read_all(self):
+        cursor = db.schedule_items.find(self.query, {"day": 1, "item": 1}) \
+            .sort([("day", 1), ("position", 1)])
+        return self._assemble(cursor)
+
+    def _read_day(self, day):
+        cursor = db.schedule_items.find({**self.query, "day": str(day)}, {"day": 1, "item": 1}).sort("position", 1)
+        return self._assemble(cursor).get(str(day), [])
+
+    def read_schedule(self):
+        return self._consistent_read(self._read_all)
+
+    def read_day(self, day):
+        return self._consistent_read(lambda: self._read_day(day))
+
+    def add_item(self, day, item, revision):
+        day = str(day)
+        new_revision = self._begin_write(revision)
+        try:
+            for _ in range(3):
+                position = self._allocate({day: 1})[day]
+                try:
+                    db.schedule_items.insert_one(to_item_docs(self.room_oid, day, [item], position)[0])
+                    return new_revision
+                except DuplicateKeyError:
+                    self._resync_counter(day)
+            raise ScheduleConflict(f"Could not allocate a position on day {day}")
+        finally:
+            self._end_write(new_revision)
+
+    def replace_item(self, day, index, item, revision):
+        item_id = self._nth(day, index)
+        new_revision = self._begin_write(revision)
+        try:
+            result = db.schedule_items.update_one(
+                {"_id": item_id},
+                {"$set": {"item": item, "start": item_start(item)}}
+            )
+            if result.matched_count == 0:
+                raise ScheduleConflict(f"Item {index} on day {day} no longer exists")
+            return new_revision
+        finally:
+            self._end_write(new_revision)
+
+    def delete_item(self, day, index, revision):
+        # 뒤 항목의 position을 당기지 않음 (순서만 유지되면 되므로 빈 번호는 그대로 둠)
+        item_id = self._nth(day, index)
+        new_revision = self._begin_write(revision)
+        try:
+            if db.schedule_items.delete_one({"_id": item_id}).deleted_count == 0:
+                raise ScheduleConflict(f"Item {index} on day {day} no longer exists")
+            return new_revision
+        finally:
+            self._end_write(new_revision)
+
+    def replace_schedule(self, schedule, meta=None, revision=None):
+        new_revision = self._begin_write(revision, meta)
+        try:
+            # 새 일정을 새로 예약한 position에 먼저 넣고 기존 문서는 그 뒤에 _id로 삭제
+            # (중간에 실패해도 일정이 통째로 사라지지 않음, 쓰기 중 표시가 있는 동안 읽기는 기다림)
+            old_ids = [d["_id"] for d in db.schedule_items.find(self.query, {"_id": 1})]
+            schedule = {str(day): items for day, items in schedule.items()}
+            first = self._allocate({day: len(items) for day, items in schedule.items() if items})
+            docs = []
+            for day, items in schedule.items():
+                if items:
+                    docs.extend(to_item_docs(self.room_oid, day, items, first[day]))
+            if docs:
+                try:
+                    db.schedule_items.insert_many(docs)
+                except Exception:
+                    # 일부만 들어간 새 문서를 지워 기존 일정만 남김 (insert_many가 _id를 미리 채움)
+                    db.schedule_items.delete_many({"_id": {"$in": [d["_id"] for d in docs if "_id" in d]}})
+                    raise
+            if old_ids:
+                db.schedule_items.delete_many({"_id": {"$in": old_ids}})
+            return new_revision
+        finally:
+            self._end_write(new_revision)
+
+    def delete_all(self):
+        db.schedule_items.delete_many(self.query)
+        return db.schedules.delete_one(self.query).deleted_count > 0
+
+
+REPOSITORIES = {
+    EmbeddedScheduleRepository.storage: EmbeddedScheduleRepository,
+    SplitScheduleRepository.storage: SplitScheduleRepository,
+}
+
+
+def get_schedule_repository(room_id):
+    """방의 저장 방식에 맞는 일정 저장소 반환"""
+    room_oid = ObjectId(room_id)
+    meta = db.schedules.find_one({"room_id": room_oid}, {"storage": 1})
+    storage = meta.get("storage", "embedded") if meta else DEFAULT_STORAGE
+    return REPOSITORIES[storage](room_oid)
@@ -0,0 +1,132 @@
+from bson import ObjectId
+from datetime import datetime, timezone
+from db import db
+from util.json_patch import make_patch, apply_patch
+from util.schedule_repository import get_schedule_repository
+
+# N번째 리비전마다 전체 스냅샷을 함께 저장해 복원 시 적용할 패치 수를 제한
+SNAPSHOT_INTERVAL = 20
+
+
+def _save_baseline(room_oid, schedule, overwrite):
+    """rev 0 (기록 시작 전 상태) 전체 스냅샷 저장"""
+    fields = {"source": "baseline", "createdAt": datetime.now(timezone.utc), "patch": [], "snapshot": schedule}
+    db.schedule_revisions.update_one(
+        {"room_id": room_oid, "rev": 0},
+        {"$set": fields} if overwrite else {"$setOnInsert": fields},
+        upsert=True
+    )
+
+
+def ensure_revision_baseline(room_id):
+    """
+    리비전 기록 이전부터 있던 일정이면, 쓰기 전에 현재 전체 일정을 rev 0으로 저장.
+    일정을 바꾸는 모든 경로에서 쓰기 직전에 호출해야 첫 변경(예: AI 피드백)도 되돌릴 수 있음
+    """
+    room_oid = ObjectId(room_id)
+    # revision 0 설정과 embedded 일정 읽기를 한 번의 원자적 연산으로 처리
+    doc = db.schedules.find_one_and_update(
+        {"room_id": room_oid, "revision": {"$exists": False}},
+        {"$set": {"revision": 0}},
+        projection={"schedule": 1, "storage": 1}
+    )
+    if not doc:
+        return
+    if doc.get("storage") == "split":
+        schedule = get_schedule_repository(room_id).get_schedule() or {}
+    else:
+        schedule = doc.get("schedule", {})
+    _save_baseline(room_oid, schedule, overwrite=True)
+
+
+def _current_snapshot(room_id, rev):
+    """지금 저장된 일정이 정확히 rev 시점이면 그 전체 일정, 이미 다음 쓰기가 반영됐으면 None"""
+    schedule, current_rev = get_schedule_repository(room_id).read_schedule()
+    return schedule if schedule is not None and current_rev == rev else None
+
+
+def record_revision(room_id, before, after, source, rev):
+    """
+    일정 변경 내역을 이전 버전 대비 JSON Patch로 기록.
+    rev는 일정 쓰기가 원자적으로 올린 revision (저장소 쓰기 메서드의 반환값)이고,
+    before는 그 직전 revision에서 읽은 상태이므로 패치는 항상 바로 앞 리비전 기준임.
+    before / after는 전체 일정 또는 변경된 날짜만 담은 {day: [...]} 일부여도 됨
+    (패치 경로가 일정 루트 기준 /<day>/... 이므로 동일하게 적용 가능)
+    """
+    if rev is None:
+        return None
+
+    room_oid = ObjectId(room_id)
+    patch = make_patch(before or {}, after or {})
+    entry = {
+        "room_id": room_oid,
+        "rev": rev,
+        "source": source,
+        "createdAt": datetime.now(timezone.utc),
+        "patch": patch,
+    }
+    if rev == 1:
+        # 이번 쓰기로 일정 문서가 새로 생긴 경우 이전 상태는 빈 일정
+        # (ensure_revision_baseline이 저장한 rev 0이 있으면 덮어쓰지 않음)
+        _save_baseline(room_oid, {}, overwrite=False)
+
+    # 쓰기 후 기록 전에 실패한 요청이 있으면 바로 앞 리비전이 없거나 이어지지 않음 (gap).
+    # 이때는 현재 전체 일정을 스냅샷으로 저장해 이후 리비전이 다시 복원 가능하도록 함
+    previous = db.schedule_revisions.find_one({"room_id": room_oid, "rev": rev - 1}, {"unanchored": 1})
+    gap = previous is None or previous.get("unanchored", False)
+
+    if gap or rev % SNAPSHOT_INTERVAL == 0:
+        snapshot = None
+        if not gap:
+            # 주기적인 스냅샷은 이전 리비전 + 이번 패치로 만듦 (다른 요청의 변경이 섞이지 않도록)
+            try:
+                base = load_revision(room_id, rev - 1)
+                if base is not None:
+                    snapshot = apply_patch(base, patch)
+            except Exception as e:
+                print(f"Rebuilding snapshot for room {room_id} rev {rev} from current schedule: {e}")
+        if snapshot is None:
+            snapshot = _current_snapshot(room_id, rev)
+        if snapshot is not None:
+            entry["snapshot"] = snapshot
+        elif gap:
+            # 이미 다음 쓰기가 반영돼 이 시점 전체 일정을 알 수 없음 → 다음 리비전이 스냅샷을 남기도록 표시
+            entry["unanchored"] = True
+
+    db.schedule_revisions.insert_one(entry)
+    return rev
+
+
+def load_revision(room_id, rev):
+    """
+    가장 가까운 이전 스냅샷에서 패치를 순서대로 적용해 rev 시점의 일정 복원.
+    중간 리비전이 빠져 있어 복원할 수 없으면 None
+    """
+    room_oid = ObjectId(room_id)
+    base = db.schedule_revisions.find_one(
+        {"room_id": room_oid, "rev": {"$lte": rev}, "snapshot": {"$exists": True}},
+        {"rev": 1, "snapshot": 1},
+        sort=[("rev", -1)]
+    )
+    if not base:
+        return None
+
+    schedule = base["snapshot"]
+    expected = base["rev"] + 1
+    cursor = db.schedule_revisions.find(
+        {"room_id": room_oid, "rev": {"$gt": base["rev"], "$lte": rev}},
+        {"rev": 1, "patch": 1}
+    ).sort("rev", 1)
+    for entry in cursor:
+        if entry["rev"] != expected:
+            return None
+        schedule = apply_patch(schedule, entry["patch"])
+        expected += 1
+
+    if expected != rev + 1:
+        return None
+    return schedule
+
+
+def delete_revisions(room_id):
+    db.schedule_revisions.delete_many({"room_id": ObjectId(room_id)})
@@ -0,0 +1,50 @@
+"""
+사용자 검색용 정규화 필드 (idLower / nicknameLower).
+
+정규화 규칙이 바뀌거나 필드가 없는 기존 사용자는 서버 시작 시가 아니라
+아래 CLI로 한 번 다시 채움 (searchKeyVersion 인덱스로 대상만 배치 조회).
+
+CLI: python -m util.search_keys [--batch 500]
+"""
+from pymongo import UpdateOne
+import argparse, unicodedata
+
+# 정규화 규칙이 바뀌면 올려서 기존 사용자를 다시 채우도록 함
+SEARCH_KEY_VERSION = 1
+
+
+def search_key(text):
+    """사용자 검색용 정규화 (가입 / 기존 데이터 채우기 / 검색어 모두 같은 규칙 사용)"""
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def search_fields(login_id, nickname):
+    return {
+        "idLower": search_key(login_id),
+        "nicknameLower": search_key(nickname),
+        "searchKeyVersion": SEARCH_KEY_VERSION,
+    }
+
+
+def backfill_search_keys(batch_size=500):
+    """검색용 정규화 필드가 없거나 이전 규칙으로 만들어진 사용자를 배치 단위로 다시 채움, 갱신한 수 반환"""
+    from db import users
+
+    query = {"searchKeyVersion": {"$ne": SEARCH_KEY_VERSION}}
+    updated = 0
+    while True:
+        batch = list(users.find(query, {"id": 1, "nickname": 1}).limit(batch_size))
+        if not batch:
+            return updated
+        users.bulk_write([
+            UpdateOne({"_id": u["_id"]}, {"$set": search_fields(u.get("id", ""), u.get("nickname", ""))})
+            for u in batch
+        ], ordered=False)
+        updated += len(batch)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill normalized user search keys")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    print({"updated": backfill_search_keys(args.batch)})
@@ -0,0 +1,100 @@
+"""
+HMAC 서명된 만료형 세션 토큰.
+
+토큰 형식: base64url(JSON payload) + "." + base64url(HMAC-SHA256 서명)
+payload: {"sub": 사용자 ObjectId 문자열, "id": 로그인 ID, "exp": 만료 시각(epoch 초)}
+서명만 검증하므로 DB 조회 없이 사용자를 식별할 수 있음.
+
+환경변수
+- SESSION_SECRET: 서명 키 (모든 서버 프로세스가 같은 값을 써야 함)
+- SESSION_TTL: 토큰 유효 기간(초, 기본 7일)
+"""
+from flask import request
+import base64, hashlib, hmac, json, os, time
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", 7 * 24 * 3600))
+
+# 프로세스마다 다른 임의 키를 쓰면 다른 워커 / 재시작 후에 토큰이 모두 무효가 되므로,
+# SESSION_SECRET이 없으면 토큰을 발급하지 않음 (로그인 응답의 token이 null)
+_secret = os.getenv("SESSION_SECRET")
+SECRET = _secret.encode() if _secret else None
+if SECRET is None:
+    print("SESSION_SECRET is not set; session tokens are disabled")
+
+
+class InvalidSessionToken(Exception):
+    """토큰 서명이 맞지 않거나 만료된 경우 (401)"""
+
+
+class SessionMismatch(Exception):
+    """요청 본문 / 경로의 사용자 ID가 토큰의 사용자와 다른 경우 (403)"""
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(body):
+    return _b64encode(hmac.new(SECRET, body.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user_oid, login_id, ttl=SESSION_TTL):
+    """(토큰, 만료 시각) 반환. SESSION_SECRET이 없으면 (None, None)"""
+    if SECRET is None:
+        return None, None
+    payload = {"sub": str(user_oid), "id": login_id, "exp": int(time.time()) + ttl}
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{_sign(body)}", payload["exp"]
+
+
+def verify_token(token):
+    """유효한 토큰이면 payload, 아니면 None"""
+    if SECRET is None:
+        return None
+    try:
+        body, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(body)):
+            return None
+        payload = json.loads(_b64decode(body))
+    except (ValueError, TypeError):
+        return None
+    if payload.get("exp", 0) < time.time():
+        return None
+    return payload
+
+
+def current_session():
+    """Authorization: Bearer 토큰의 payload (헤더가 없으면 None, 잘못된 토큰이면 InvalidSessionToken)"""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    payload = verify_token(header[len("Bearer "):].strip())
+    if payload is None:
+        raise InvalidSessionToken()
+    return payload
+
+
+def session_user_id(claimed=None):
+    """
+    세션 토큰이 있으면 토큰의 사용자 ID를, 없으면 클라이언트가 보낸 ID를 반환.
+    (토큰 없이 사용자 ID를 보내는 기존 클라이언트와 호환)
+    """
+    session = current_session()
+    if session is None:
+        return claimed
+    if claimed and claimed != session["sub"]:
+        raise SessionMismatch()
+    return session["sub"]
+
+
+def optional_session_user_id():
+    """유효한 세션 토큰의 사용자 ID (없거나 잘못된 토큰이면 None, 예외 없음)"""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    payload = verify_token(header[len("Bearer "):].strip())
+    return payload["sub"] if payload else None